@@ -4,16 +4,23 @@ Web Application for PDF Renaming
 Flask-based web app that allows users to upload PDFs and get suggested names
 """
 
+import errno
 import hmac
 import io
 import json
 import os
+import queue
+import re
+import secrets
 import shutil
+import stat
+import struct
 import sys
+import tempfile
 import threading
 import time
-import uuid
 import zipfile
+import zlib
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
@@ -31,6 +38,8 @@ if "--test-imports" in sys.argv:
 
 from flask import (
     Flask,
+    Request,
+    Response,
     request,
     jsonify,
     render_template,
@@ -39,6 +48,7 @@ from flask import (
     session,
     url_for,
 )
+from flask.json.provider import DefaultJSONProvider
 from pdf_processor import PDFProcessor
 from license_utils import (
     get_machine_fingerprint,
@@ -47,14 +57,120 @@ from license_utils import (
     validate_license,
 )
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Production WSGI server for the local/desktop entry points
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
 # PyInstaller compatibility: templates/static relative to bundle/extracted dir
 BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(os.path.abspath(__file__)).parent))
 TEMPLATES_DIR = BASE_DIR / "templates"
 STATIC_DIR = BASE_DIR / "static"
-# Use /tmp for uploads on Vercel (read-only filesystem), local dir otherwise
-UPLOAD_DIR = (
-    Path("/tmp/pdfns_uploads") if os.environ.get("VERCEL") else BASE_DIR / "uploads"
-)
+MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB per request (batched uploads)
+
+
+def _private_dir(path):
+    """Create *path* as a 0700 directory; True only if it is safely ours.
+
+    /dev/shm is shared and world-writable: another local user could create
+    the directory first (or a symlink in its place) and read the PDFs.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+    )
+
+
+def _pick_upload_dir():
+    """Where session PDFs live.
+
+    PDFNS_UPLOAD_DIR overrides everything; Vercel only allows writes to /tmp.
+    Otherwise prefer the /dev/shm tmpfs when it has room for a few full-size
+    requests: session files live for minutes, so durability doesn't matter.
+    The tmpfs dir is per user and must be a private directory we own.
+    """
+    override = os.environ.get("PDFNS_UPLOAD_DIR")
+    if override:
+        return Path(os.path.abspath(override))
+    if os.environ.get("VERCEL"):
+        return Path("/tmp/pdfns_uploads")
+    shm = Path("/dev/shm")
+    if shm.is_dir() and hasattr(os, "statvfs") and hasattr(os, "getuid"):
+        try:
+            st = os.statvfs(shm)
+            if st.f_bavail * st.f_frsize >= 4 * MAX_CONTENT_LENGTH:
+                path = shm / f"pdfns_uploads-{os.getuid()}"
+                if _private_dir(path):
+                    return path
+        except OSError:
+            pass
+    return BASE_DIR / "uploads"
+
+
+UPLOAD_DIR = _pick_upload_dir()
+
+# Requests up to this size keep their file parts in memory; larger are spooled
+_SPOOL_IN_MEMORY_MAX = 500 * 1024
+# Linux only; linked into place through /proc/self/fd
+_O_TMPFILE = getattr(os, "O_TMPFILE", 0) if os.path.isdir("/proc/self/fd") else 0
+
+
+class _UploadRequest(Request):
+    """Request that spools large file parts directly into UPLOAD_DIR.
+
+    Werkzeug buffers every multipart file in a temporary file and
+    ``FileStorage.save`` then copies it a second time. Spooling into the
+    upload folder lets ``_store_upload`` link or rename the part into the session
+    directory instead of copying it.
+    """
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        if (
+            total_content_length is not None
+            and total_content_length <= _SPOOL_IN_MEMORY_MAX
+        ):
+            # Whole body is small: a plain BytesIO (not Werkzeug's
+            # SpooledTemporaryFile) so upload_pdf can hand the bytes to analyze
+            return io.BytesIO()
+        if _O_TMPFILE:
+            # Unnamed inode: nothing to clean up if the part is rejected or
+            # the process dies; _store_upload links it into the session.
+            try:
+                return open(os.open(UPLOAD_DIR, _O_TMPFILE | os.O_RDWR, 0o600), "w+b")
+            except OSError:
+                pass  # filesystem without O_TMPFILE support
+        part = tempfile.NamedTemporaryFile(
+            "w+b", dir=UPLOAD_DIR, suffix=".part", delete=False
+        )
+        self.__dict__.setdefault("_spooled_parts", []).append(part.name)
+        return part
+
+    def close(self):
+        super().close()
+        # Parts that were not moved into a session (rejected, failed) are dropped
+        for name in self.__dict__.get("_spooled_parts", ()):
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+
 
 app = Flask(
     __name__,
@@ -62,16 +178,36 @@ app = Flask(
     static_folder=str(STATIC_DIR),
     static_url_path="/static",
 )
-app.config["MAX_CONTENT_LENGTH"] = (
-    100 * 1024 * 1024
-)  # 100MB per request (batched uploads)
+app.request_class = _UploadRequest
+
+
+class _OrjsonProvider(DefaultJSONProvider):
+    """Flask's JSON provider with orjson doing the (de)serialization."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
+# Behind nginx/Apache, let the front server stream downloads with sendfile(2)
+app.use_x_sendfile = os.environ.get("USE_X_SENDFILE") == "1"
+app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
 app.config["UPLOAD_FOLDER"] = str(UPLOAD_DIR)
 app.config["SECRET_KEY"] = os.environ.get(
     "FLASK_SECRET_KEY", "change-this-in-production-use-env-var"
 )
 
+# Resolved once; request handlers join session ids onto it
+_UPLOAD_ROOT = Path(app.config["UPLOAD_FOLDER"])
+
 # Ensure upload folder exists
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+os.makedirs(_UPLOAD_ROOT, exist_ok=True)
 
 
 @app.errorhandler(413)
@@ -89,6 +225,7 @@ def request_entity_too_large(error):
 
 # Allowed extensions
 ALLOWED_EXTENSIONS = {"pdf"}
+_ALLOWED_SUFFIXES = tuple(f".{ext}" for ext in ALLOWED_EXTENSIONS)
 
 # ── License / access guard ────────────────────────────────────────────────────
 _IS_VERCEL = bool(os.environ.get("VERCEL"))
@@ -186,15 +323,21 @@ def _evict_expired_excel_sessions():
 
 
 def _cleanup_old_session_dirs():
-    upload_root = Path(app.config["UPLOAD_FOLDER"])
-    if not upload_root.is_dir():
-        return
     now = time.time()
-    for entry in upload_root.iterdir():
-        if entry.is_dir():
+    try:
+        entries = os.scandir(_UPLOAD_ROOT)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
             try:
-                if now - entry.stat().st_mtime > _SESSION_TTL:
-                    shutil.rmtree(entry, ignore_errors=True)
+                if now - entry.stat().st_mtime <= _SESSION_TTL:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                elif entry.name.endswith(".part"):
+                    # Spooled upload orphaned by a crash mid-request
+                    os.unlink(entry.path)
             except Exception:
                 pass
 
@@ -209,14 +352,72 @@ def _background_cleanup():
             pass
 
 
+# Files/session dirs to delete once their download has been sent. Deleting
+# (rmtree in particular) happens off the request thread.
+_REAP_QUEUE = queue.SimpleQueue()
+
+
+def _reaper():
+    while True:
+        path = _REAP_QUEUE.get()
+        try:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
 def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return bool(filename) and filename.lower().endswith(_ALLOWED_SUFFIXES)
 
 
 processor = PDFProcessor()
+# Pay PyMuPDF/regex start-up cost now (shared by forked workers under --preload)
+processor.warmup()
+
+# Shared across requests so batched uploads don't pay thread start-up each time.
+# Pages are rendered in-process by PyMuPDF and OCR'd by tesserocr (which
+# releases the GIL) or, without it, by tesseract subprocesses, so the OCR part
+# of concurrent analyses overlaps; the regex post-processing does not.
+_ANALYZE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(8, os.cpu_count() or 2), thread_name_prefix="analyze"
+)
+
+_cleanup_thread = _reaper_thread = None
+_background_pid = None
+_background_lock = threading.Lock()
 
-_cleanup_thread = threading.Thread(target=_background_cleanup, daemon=True)
-_cleanup_thread.start()
+
+def _ensure_background_threads():
+    """Start the cleanup and reaper threads in this process if not running.
+
+    Threads don't survive fork: under ``gunicorn --preload`` the module is
+    imported in the master, so each worker starts its own on its first
+    request (or first reap).
+    """
+    global _cleanup_thread, _reaper_thread, _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        _cleanup_thread = threading.Thread(target=_background_cleanup, daemon=True)
+        _cleanup_thread.start()
+        _reaper_thread = threading.Thread(target=_reaper, daemon=True, name="reaper")
+        _reaper_thread.start()
+        _background_pid = os.getpid()
+
+
+def _reap(path):
+    """Delete *path* (file or session dir) in the background."""
+    _ensure_background_threads()
+    _REAP_QUEUE.put(path)
+
+
+_ensure_background_threads()
+app.before_request(_ensure_background_threads)
 
 
 @app.route("/")
@@ -227,11 +428,72 @@ def index():
 
 def _session_dir(session_id):
     """Directory where this session's PDFs are stored."""
-    path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
-    path.mkdir(parents=True, exist_ok=True)
+    path = _UPLOAD_ROOT / str(session_id)
+    try:
+        os.mkdir(path)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        # Upload root removed underneath us (e.g. by a tmp cleaner)
+        path.mkdir(parents=True, exist_ok=True)
     return path
 
 
+def _copy_file_range(stream, dest):
+    """Copy a file-backed upload stream to *dest* inside the kernel (Linux)."""
+    src_fd = stream.fileno()
+    stream.flush()
+    size = os.fstat(src_fd).st_size
+    with open(dest, "wb") as out:
+        offset = 0
+        while offset < size:
+            copied = os.copy_file_range(src_fd, out.fileno(), size - offset, offset)
+            if not copied:
+                break
+            offset += copied
+
+
+def _store_upload(file, dest):
+    """Write an uploaded file to *dest*, renaming it if it was spooled to disk."""
+    stream = file.stream
+    part = getattr(stream, "name", None)
+    if isinstance(part, int) and _O_TMPFILE:
+        # O_TMPFILE spool: give the unnamed inode its session name
+        stream.flush()
+        try:
+            try:
+                os.unlink(dest)
+            except FileNotFoundError:
+                pass
+            os.link(f"/proc/self/fd/{part}", dest)
+            return
+        except OSError:
+            pass  # e.g. EXDEV; copy below
+    elif isinstance(part, str) and Path(part).parent == UPLOAD_DIR:
+        stream.close()
+        try:
+            os.replace(part, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Session dir on another filesystem: copyfile uses sendfile(2)
+            shutil.copyfile(part, dest)
+        return
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(stream, dest)
+            return
+        except OSError:
+            # In-memory stream (no fileno), or kernel without cross-fs support
+            pass
+    file.save(str(dest))
+
+
+# Chars dropped from download names: \w matches exactly str.isalnum() plus "_",
+# so accented letters and Ñ survive while path/header-unsafe chars do not
+_RE_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w .()-]")
+
+
 def _safe_download_filename(name):
     """Sanitize filename for Content-Disposition (evitar caracteres problemáticos)."""
     if not name or not name.strip():
@@ -239,10 +501,24 @@ def _safe_download_filename(name):
     name = name.strip()
     if not name.lower().endswith(".pdf"):
         name = name + ".pdf"
-    return (
-        "".join(c for c in name if c.isalnum() or c in " ._-()").strip()
-        or "documento.pdf"
-    )
+    return _RE_UNSAFE_FILENAME_CHARS.sub("", name).strip() or "documento.pdf"
+
+
+def _unique_filename(name, used):
+    """name, or name_2.pdf, name_3.pdf... (first one not in *used*).
+
+    *used* is a set of lowercased names already taken, updated in place:
+    duplicates in a ZIP would overwrite each other when extracted (on Windows
+    also if they only differ in case), and the check stays in memory.
+    """
+    stem, ext = os.path.splitext(name)
+    candidate = name
+    n = 1
+    while candidate.lower() in used:
+        n += 1
+        candidate = f"{stem}_{n}{ext}"
+    used.add(candidate.lower())
+    return candidate
 
 
 @app.route("/api/upload-excel", methods=["POST"])
@@ -258,10 +534,10 @@ def upload_excel():
     if not file.filename.lower().endswith(".xlsx"):
         return jsonify({"error": "Solo se aceptan archivos .xlsx"}), 400
 
-    excel_session = str(uuid.uuid4())
+    excel_session = secrets.token_urlsafe(12)
     session_path = _session_dir(excel_session)
     excel_path = session_path / "reference.xlsx"
-    file.save(str(excel_path))
+    _store_upload(file, excel_path)
 
     excel_path_str = str(excel_path)
     _excel_paths[excel_session] = excel_path_str
@@ -319,6 +595,22 @@ def configure_excel(excel_session):
         return jsonify({"error": str(e)}), 400
 
 
+def _analysis_result(analysis, **extra):
+    """API view of a PDFProcessor.analyze() result, shared by upload/reanalyze."""
+    result = {
+        "success": bool(analysis.get("success")),
+        "candidates": analysis.get("candidates", {}),
+        "defaults": analysis.get("defaults", {}),
+        "notes": analysis.get("notes", []),
+        "detected_format": analysis.get("detected_format"),
+        "nombre_excel": analysis.get("nombre_excel"),
+        "match_percentage": analysis.get("match_percentage"),
+        "excel_dni_found": analysis.get("excel_dni_found"),
+    }
+    result.update(extra)
+    return result
+
+
 @app.route("/api/upload", methods=["POST"])
 def upload_pdf():
     """Handle PDF upload and return suggested names. Keeps files for download."""
@@ -335,12 +627,12 @@ def upload_pdf():
     excel_lookup = _excel_lookups.get(excel_session) if excel_session else None
 
     # Support appending to an existing session (for batched uploads)
-    session_id = request.form.get("session_id", "").strip() or str(uuid.uuid4())
+    session_id = request.form.get("session_id", "").strip() or secrets.token_urlsafe(12)
     session_path = _session_dir(session_id)
     file_index_start = int(request.form.get("file_index_start", "0"))
 
     # Phase 1: save files sequentially (stream read must stay on main thread)
-    tasks = []  # (file_index, original_name, filepath | None, error | None)
+    tasks = []  # (file_index, original_name, path | bytes | None, error | None)
     file_index = file_index_start
     for file in files:
         if not allowed_file(file.filename):
@@ -355,15 +647,19 @@ def upload_pdf():
             continue
         filepath = session_path / f"{file_index}.pdf"
         try:
-            file.save(str(filepath))
-            tasks.append((file_index, file.filename, filepath, None))
+            # Parts small enough to stay in memory are analyzed from their
+            # bytes; the copy on disk is only needed for preview/download
+            getvalue = getattr(file.stream, "getvalue", None)
+            source = getvalue() if getvalue else str(filepath)
+            _store_upload(file, filepath)
+            tasks.append((file_index, file.filename, source, None))
             file_index += 1
         except Exception as e:
             tasks.append((None, file.filename, None, str(e)))
 
     # Phase 2: analyze files in parallel
     def _analyze_task(task):
-        idx, orig_name, filepath, err = task
+        idx, orig_name, source, err = task
         if err:
             return {
                 "original_name": orig_name,
@@ -373,25 +669,18 @@ def upload_pdf():
             }
         try:
             analysis = processor.analyze(
-                str(filepath),
+                source,
                 original_filename=orig_name,
                 verbose=False,
                 excel_lookup=excel_lookup,
             )
-            result = {
-                "success": bool(analysis.get("success")),
-                "original_name": orig_name,
-                "suggested_name": analysis.get("suggested_name"),
-                "candidates": analysis.get("candidates", {}),
-                "defaults": analysis.get("defaults", {}),
-                "notes": analysis.get("notes", []),
-                "text_chars": analysis.get("text_chars", 0),
-                "file_index": idx,
-                "detected_format": analysis.get("detected_format"),
-                "nombre_excel": analysis.get("nombre_excel"),
-                "match_percentage": analysis.get("match_percentage"),
-                "excel_dni_found": analysis.get("excel_dni_found"),
-            }
+            result = _analysis_result(
+                analysis,
+                original_name=orig_name,
+                suggested_name=analysis.get("suggested_name"),
+                text_chars=analysis.get("text_chars", 0),
+                file_index=idx,
+            )
             # Cache defaults for fast preview generation
             try:
                 (session_path / f"{idx}.defaults.json").write_text(
@@ -408,9 +697,7 @@ def upload_pdf():
                 "file_index": None,
             }
 
-    max_workers = min(len(tasks), 4) or 1
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(executor.map(_analyze_task, tasks))
+    results = list(_ANALYZE_EXECUTOR.map(_analyze_task, tasks))
 
     return jsonify({"session_id": session_id, "results": results})
 
@@ -427,7 +714,7 @@ def reanalyze_pdf(session_id, file_index):
     if forced_format not in ("hudbay", "standard"):
         return jsonify({"error": "Invalid format"}), 400
 
-    session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+    session_path = _UPLOAD_ROOT / str(session_id)
     pdf_path = session_path / f"{file_index}.pdf"
     if not pdf_path.is_file():
         return jsonify({"error": "File not found"}), 404
@@ -450,18 +737,7 @@ def reanalyze_pdf(session_id, file_index):
     except Exception:
         pass
 
-    return jsonify(
-        {
-            "success": bool(analysis.get("success")),
-            "candidates": analysis.get("candidates", {}),
-            "defaults": analysis.get("defaults", {}),
-            "notes": analysis.get("notes", []),
-            "detected_format": analysis.get("detected_format"),
-            "nombre_excel": analysis.get("nombre_excel"),
-            "match_percentage": analysis.get("match_percentage"),
-            "excel_dni_found": analysis.get("excel_dni_found"),
-        }
-    )
+    return jsonify(_analysis_result(analysis))
 
 
 @app.route("/api/preview/<session_id>/<int:file_index>")
@@ -472,7 +748,7 @@ def preview_pdf(session_id, file_index):
       page (int, default 0) — 0-based page index to render (single page mode)
     Returns first page quickly; frontend requests additional pages on demand.
     """
-    session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+    session_path = _UPLOAD_ROOT / str(session_id)
     pdf_path = session_path / f"{file_index}.pdf"
     if not pdf_path.is_file():
         return jsonify({"success": False, "error": "File not found"}), 404
@@ -520,23 +796,208 @@ def download_file(session_id, file_index):
     filename = request.args.get("filename", "").strip()
     filename = _safe_download_filename(filename)
 
-    session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+    session_path = _UPLOAD_ROOT / str(session_id)
     path = session_path / f"{file_index}.pdf"
     if not path.is_file():
         return jsonify({"error": "File not found or expired"}), 404
 
-    try:
-        return send_file(
-            path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/pdf",
+    response = send_file(
+        path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype="application/pdf",
+        conditional=True,
+        etag=True,
+        max_age=0,
+    )
+    # Only a complete 200 body means the user has the file: keep it for
+    # 206 (range/resumed download) and 304 (revalidation) responses. With
+    # X-Sendfile the front server reads the file after we return; the
+    # session TTL cleanup removes it instead.
+    if response.status_code == 200 and not app.use_x_sendfile:
+        response.call_on_close(lambda: _reap(path))
+    return response
+
+
+_ZIP_CHUNK_SIZE = 1024 * 1024
+# PDFs are already deflate/JPEG compressed; re-deflating costs CPU for ~1-2%.
+# Streamed downloads are always STORED with final CRC/sizes in each local
+# header (see _zip_response): zipfile on an unseekable sink would add data
+# descriptors, which streaming readers reject for STORED entries
+_ZIP_COMPRESSION = zipfile.ZIP_STORED
+
+
+def _zip_entry_info(src, name):
+    """ZipInfo for a STORED entry of the open file *src*, CRC and sizes filled in.
+
+    Metadata comes from the handle (fstat), so it describes exactly the bytes
+    that will be streamed from it even if the path is replaced or deleted.
+    """
+    st = os.fstat(src.fileno())
+    # Same clamping as ZipInfo.from_file(strict_timestamps=False)
+    date_time = time.localtime(st.st_mtime)[:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    elif date_time[0] > 2107:
+        date_time = (2107, 12, 31, 23, 59, 59)
+    zinfo = zipfile.ZipInfo(name, date_time)
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    zinfo.compress_type = zipfile.ZIP_STORED  # data is streamed as is
+    zinfo.file_size = zinfo.compress_size = st.st_size
+    crc = 0
+    remaining = st.st_size
+    while remaining and (chunk := src.read(min(_ZIP_CHUNK_SIZE, remaining))):
+        crc = zlib.crc32(chunk, crc)
+        remaining -= len(chunk)
+    if remaining:
+        raise OSError(f"{name}: file shrank while reading")
+    zinfo.CRC = crc
+    return zinfo
+
+
+def _copy_exact(src, size):
+    """Yield exactly *size* bytes of *src* from its start, in chunks."""
+    src.seek(0)
+    while size:
+        chunk = src.read(min(_ZIP_CHUNK_SIZE, size))
+        if not chunk:
+            raise OSError("file shrank while streaming")
+        size -= len(chunk)
+        yield chunk
+
+
+def _zip_central_directory(infos, start):
+    """Central directory + end record for entries whose data ends at *start*."""
+    records = []
+    for zinfo in infos:
+        try:
+            name = zinfo.filename.encode("ascii")
+            flags = zinfo.flag_bits
+        except UnicodeEncodeError:
+            name = zinfo.filename.encode("utf-8")
+            flags = zinfo.flag_bits | 0x800  # UTF-8 filename
+        y, mo, d, h, mi, sec = zinfo.date_time
+        records.append(
+            struct.pack(
+                zipfile.structCentralDir,
+                zipfile.stringCentralDir,
+                zinfo.create_version,
+                zinfo.create_system,
+                zinfo.extract_version,
+                zinfo.reserved,
+                flags,
+                zinfo.compress_type,
+                h << 11 | mi << 5 | sec // 2,
+                (y - 1980) << 9 | mo << 5 | d,
+                zinfo.CRC,
+                zinfo.compress_size,
+                zinfo.file_size,
+                len(name),
+                len(zinfo.extra),
+                len(zinfo.comment),
+                0,
+                zinfo.internal_attr,
+                zinfo.external_attr,
+                zinfo.header_offset,
+            )
+            + name
+            + zinfo.extra
+            + zinfo.comment
         )
-    finally:
+    central = b"".join(records)
+    end = struct.pack(
+        zipfile.structEndArchive,
+        zipfile.stringEndArchive,
+        0,
+        0,
+        len(infos),
+        len(infos),
+        len(central),
+        start,
+        0,
+    )
+    return central + end
+
+
+def _zip_response(entries, download_name):
+    """ZIP of (path, arcname) entries as a download with an exact Content-Length.
+
+    Every PDF is opened once up front and both the CRC pass and the body are
+    read from those handles, so a file deleted or replaced in between (TTL
+    sweep, a concurrent download's reaper) cannot change the streamed bytes.
+    Entries are STORED with CRC and sizes known before the first byte, so
+    every local header is final (no data descriptors; streaming unzippers can
+    read it). The CRC pass reads all PDFs before the response starts.
+    Archives past the 32-bit ZIP limits are written to a temp file with
+    zipfile (which adds the ZIP64 records) and sent from there.
+    """
+    handles = []
+
+    def close_all():
+        for src in handles:
+            src.close()
+
+    infos = []
+    offset = 0
+    try:
+        for path, name in entries:
+            src = open(path, "rb")
+            handles.append(src)
+            zinfo = _zip_entry_info(src, name)
+            zinfo.header_offset = offset
+            offset += len(zinfo.FileHeader()) + zinfo.file_size
+            infos.append(zinfo)
+
+        if offset > zipfile.ZIP64_LIMIT or len(infos) >= 0xFFFF:
+            # System temp dir (TMPDIR), not _UPLOAD_ROOT: that may be a RAM
+            # tmpfs, and this archive is over 4 GiB
+            tmp = tempfile.TemporaryFile()
+            try:
+                with zipfile.ZipFile(tmp, "w", allowZip64=True) as zf:
+                    for src, zinfo in zip(handles, infos):
+                        with zf.open(zinfo, "w") as dst:
+                            for chunk in _copy_exact(src, zinfo.file_size):
+                                dst.write(chunk)
+                size = tmp.tell()
+                tmp.seek(0)
+            except BaseException:
+                tmp.close()
+                raise
+            close_all()
+            response = send_file(
+                tmp,
+                mimetype="application/zip",
+                as_attachment=True,
+                download_name=download_name,
+            )
+            response.content_length = size
+            return response
+    except BaseException:
+        close_all()
+        raise
+
+    tail = _zip_central_directory(infos, offset)
+
+    def generate():
         try:
-            path.unlink()
-        except Exception:
-            pass
+            for src, zinfo in zip(handles, infos):
+                yield zinfo.FileHeader()
+                yield from _copy_exact(src, zinfo.file_size)
+            yield tail
+        finally:
+            close_all()
+
+    response = Response(
+        generate(),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={download_name}",
+            "Content-Length": str(offset + len(tail)),
+        },
+    )
+    # Also when the client disconnects before the generator starts
+    response.call_on_close(close_all)
+    return response
 
 
 @app.route("/api/download-zip", methods=["POST"])
@@ -550,38 +1011,40 @@ def download_zip():
     if not session_id or not isinstance(files, list):
         return jsonify({"error": "session_id and files (array) required"}), 400
 
-    session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+    session_path = _UPLOAD_ROOT / str(session_id)
     if not session_path.is_dir():
         return jsonify({"error": "Session not found or expired"}), 404
 
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        for item in files:
-            idx = item.get("index")
-            name = _safe_download_filename(item.get("filename", ""))
-            if idx is None:
-                continue
-            path = session_path / f"{idx}.pdf"
-            if path.is_file():
-                zf.write(path, name)
-
-    buf.seek(0)
-    try:
-        shutil.rmtree(session_path, ignore_errors=True)
-    except Exception:
-        pass
+    entries = []
+    used = set()
+    for item in files:
+        idx = item.get("index")
+        name = _safe_download_filename(item.get("filename", ""))
+        if idx is None:
+            continue
+        path = session_path / f"{idx}.pdf"
+        if path.is_file():
+            entries.append((path, _unique_filename(name, used)))
 
-    return send_file(
-        buf,
-        as_attachment=True,
-        download_name="CAMBIO_NOMBRE_descargas.zip",
-        mimetype="application/zip",
-    )
+    response = _zip_response(entries, "CAMBIO_NOMBRE_descargas.zip")
+    # Only drop the session once the last byte has been sent
+    response.call_on_close(lambda: _reap(session_path))
+    return response
 
 
 def start_server(port):
-    """Start Flask in a background thread (used by desktop mode)."""
-    app.run(debug=False, host="127.0.0.1", port=port, use_reloader=False)
+    """Serve the app on 127.0.0.1 (blocking; desktop mode runs it in a thread).
+
+    Uses waitress when installed, with a thread per core (at least 4) so
+    uploads, previews and downloads don't queue behind a slow OCR request;
+    otherwise Werkzeug's threaded dev server.
+    """
+    if waitress_serve is not None:
+        waitress_serve(
+            app, host="127.0.0.1", port=port, threads=max(4, os.cpu_count() or 1)
+        )
+    else:
+        app.run(debug=False, host="127.0.0.1", port=port, use_reloader=False)
 
 
 class Api:
@@ -591,7 +1054,7 @@ class Api:
         """Open native Save As dialog and copy the PDF with the new name."""
         import webview
 
-        session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+        session_path = _UPLOAD_ROOT / str(session_id)
         source = session_path / f"{file_index}.pdf"
         if not source.is_file():
             return {"error": "Archivo no encontrado o sesion expirada"}
@@ -623,7 +1086,7 @@ class Api:
         import json
 
         files = json.loads(files_json) if isinstance(files_json, str) else files_json
-        session_path = Path(app.config["UPLOAD_FOLDER"]) / str(session_id)
+        session_path = _UPLOAD_ROOT / str(session_id)
         if not session_path.is_dir():
             return {"error": "Sesion no encontrada o expirada"}
 
@@ -642,7 +1105,8 @@ class Api:
 
         dest = result if isinstance(result, str) else result[0]
         try:
-            with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as zf:
+            with zipfile.ZipFile(dest, "w", _ZIP_COMPRESSION) as zf:
+                used = set()
                 for item in files:
                     idx = item.get("index")
                     name = _safe_download_filename(item.get("filename", ""))
@@ -650,7 +1114,7 @@ class Api:
                         continue
                     path = session_path / f"{idx}.pdf"
                     if path.is_file():
-                        zf.write(path, name)
+                        zf.write(path, _unique_filename(name, used))
             return {"ok": True, "path": dest}
         except Exception as e:
             return {"error": str(e)}
@@ -677,7 +1141,8 @@ if __name__ == "__main__":
         )
         webview.start()
     else:
-        # Dev mode: normal Flask server
+        # Dev mode: normal Flask server (debugger/reloader only with FLASK_DEV=1;
+        # for production use wsgi.py behind gunicorn)
         print(f"\nServidor iniciado en http://localhost:{port}")
         print("   Presiona Ctrl+C para detener el servidor\n")
-        app.run(debug=True, host="127.0.0.1", port=port)
+        app.run(debug=os.environ.get("FLASK_DEV") == "1", host="127.0.0.1", port=port)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark de PDFProcessor.analyze sobre uno o más PDFs.
+
+Uso:
+    python bench_pdf.py archivo.pdf [otro.pdf | carpeta ...] --iters 5
+
+The first run of each PDF is reported apart (cold: PyMuPDF/OCR do the real
+work); the following iterations hit the per-content text cache, as a
+re-analyze in the web app would.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+import fitz
+
+from pdf_processor import PDFProcessor
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def bench(processor, pdf_path, iters):
+    with fitz.open(pdf_path) as doc:
+        pages = len(doc)
+    times = []
+    result = None
+    for _ in range(iters + 1):
+        t0 = time.perf_counter_ns()
+        result = processor.analyze(
+            pdf_path, original_filename=os.path.basename(pdf_path), verbose=False
+        )
+        times.append(time.perf_counter_ns() - t0)
+    cold_ms = times[0] / 1e6
+    warm_ms = statistics.median(times[1:]) / 1e6 if iters else float("nan")
+    return {
+        "file": os.path.basename(pdf_path),
+        "pages": pages,
+        "text_chars": result["text_chars"],
+        "cold_ms": cold_ms,
+        "warm_ms": warm_ms,
+        "pages_s": pages / (cold_ms / 1000) if cold_ms else float("inf"),
+        "peak_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdfs", nargs="+", help="PDF(s) o carpetas a analizar")
+    parser.add_argument(
+        "--iters", type=int, default=5, help="warm iterations (default 5)"
+    )
+    args = parser.parse_args()
+
+    processor = PDFProcessor()
+    processor.warmup()
+
+    header = (
+        f"{'file':<40} {'pages':>5} {'chars':>7} {'cold ms':>9} "
+        f"{'warm ms':>9} {'pages/s':>8} {'peak MB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    pdf_paths = []
+    for arg in args.pdfs:
+        pdf_paths.extend(PDFProcessor.list_pdfs(arg) if os.path.isdir(arg) else [arg])
+    for pdf_path in pdf_paths:
+        r = bench(processor, pdf_path, args.iters)
+        peak = f"{r['peak_mb']:.1f}" if r["peak_mb"] is not None else "-"
+        print(
+            f"{r['file'][:40]:<40} {r['pages']:>5} {r['text_chars']:>7} "
+            f"{r['cold_ms']:>9.1f} {r['warm_ms']:>9.2f} {r['pages_s']:>8.1f} "
+            f"{peak:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
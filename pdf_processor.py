@@ -7,9 +7,22 @@ Core functionality for extracting information from PDFs
 import os
 import sys
 import re
+import atexit
 import base64
+import bisect
+import copy
 import io
 import difflib
+import functools
+import hashlib
+import itertools
+import json
+import math
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from openpyxl import load_workbook
@@ -32,58 +45,281 @@ except ImportError:
 
 try:
     import pytesseract
-    from pdf2image import convert_from_path
 except ImportError:
     pytesseract = None
+
+try:
+    # Only needed to rasterize pages when PyMuPDF is missing
+    from pdf2image import convert_from_bytes, convert_from_path
+except ImportError:
+    convert_from_bytes = None
     convert_from_path = None
 
-# Configure bundled Tesseract/Poppler paths when running from PyInstaller
-_BUNDLE_DIR = getattr(sys, "_MEIPASS", None)
-_TESSERACT_AVAILABLE = False
-_POPPLER_PATH = None  # Store poppler path for pdf2image
-
-if _BUNDLE_DIR:
-    _tesseract_exe = os.path.join(_BUNDLE_DIR, "tesseract", "tesseract.exe")
-    if os.path.isfile(_tesseract_exe) and pytesseract:
-        pytesseract.pytesseract.tesseract_cmd = _tesseract_exe
-        os.environ["TESSDATA_PREFIX"] = os.path.join(
-            _BUNDLE_DIR, "tesseract", "tessdata"
-        )
-        _TESSERACT_AVAILABLE = True
-        print(f"[DEBUG] Tesseract configured at: {_tesseract_exe}")
-    else:
-        print(f"[WARNING] Tesseract not found at: {_tesseract_exe}")
+try:
+    # Optional: in-process Tesseract, no subprocess + model load per page
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+@functools.lru_cache(maxsize=1)
+def _configure_paths():
+    """Configure bundled/local Tesseract and Poppler paths, once per process.
+
+    Runs on first PDFProcessor() instead of at import, so importing the module
+    does no filesystem probing. Returns ``(tesseract_available, poppler_path)``.
+    """
+    tesseract_available = False
+    poppler_path = None  # Store poppler path for pdf2image
+
+    # Configure bundled Tesseract/Poppler paths when running from PyInstaller
+    bundle_dir = getattr(sys, "_MEIPASS", None)
+    if bundle_dir:
+        tesseract_exe = os.path.join(bundle_dir, "tesseract", "tesseract.exe")
+        if os.path.isfile(tesseract_exe) and pytesseract:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_exe
+            os.environ["TESSDATA_PREFIX"] = os.path.join(
+                bundle_dir, "tesseract", "tessdata"
+            )
+            tesseract_available = True
+            print(f"[DEBUG] Tesseract configured at: {tesseract_exe}")
+        else:
+            print(f"[WARNING] Tesseract not found at: {tesseract_exe}")
 
-    _poppler_dir = os.path.join(_BUNDLE_DIR, "poppler")
-    if os.path.isdir(_poppler_dir):
-        _POPPLER_PATH = _poppler_dir  # Store for explicit use in convert_from_path
-        os.environ["PATH"] = _poppler_dir + os.pathsep + os.environ.get("PATH", "")
-        print(f"[DEBUG] Poppler configured at: {_poppler_dir}")
+        poppler_dir = os.path.join(bundle_dir, "poppler")
+        if os.path.isdir(poppler_dir):
+            poppler_path = poppler_dir  # Store for explicit use in convert_from_path
+            os.environ["PATH"] = poppler_dir + os.pathsep + os.environ.get("PATH", "")
+            print(f"[DEBUG] Poppler configured at: {poppler_dir}")
+        else:
+            print(f"[WARNING] Poppler directory not found at: {poppler_dir}")
     else:
-        print(f"[WARNING] Poppler directory not found at: {_poppler_dir}")
-else:
-    # Not bundled - check for local installations on Windows
-    if sys.platform == "win32":
-        import glob
-
-        # Auto-detect Tesseract
-        if pytesseract:
-            _tesseract_local = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-            if os.path.isfile(_tesseract_local):
-                pytesseract.pytesseract.tesseract_cmd = _tesseract_local
-            _TESSERACT_AVAILABLE = True
-
-        # Auto-detect Poppler
-        _poppler_candidates = glob.glob(r"C:\poppler\poppler-*\Library\bin") + [
-            r"C:\poppler\Library\bin",
-            r"C:\ProgramData\chocolatey\lib\poppler\tools\Library\bin",
-        ]
-        for _candidate in _poppler_candidates:
-            if os.path.isfile(os.path.join(_candidate, "pdfinfo.exe")):
-                _POPPLER_PATH = _candidate
-                break
-    elif pytesseract:
-        _TESSERACT_AVAILABLE = True
+        # Not bundled - check for local installations on Windows
+        if sys.platform == "win32":
+            import glob
+
+            # Auto-detect Tesseract
+            if pytesseract:
+                tesseract_local = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+                if os.path.isfile(tesseract_local):
+                    pytesseract.pytesseract.tesseract_cmd = tesseract_local
+                tesseract_available = True
+
+            # Auto-detect Poppler
+            poppler_candidates = glob.glob(r"C:\poppler\poppler-*\Library\bin") + [
+                r"C:\poppler\Library\bin",
+                r"C:\ProgramData\chocolatey\lib\poppler\tools\Library\bin",
+            ]
+            for candidate in poppler_candidates:
+                if os.path.isfile(os.path.join(candidate, "pdfinfo.exe")):
+                    poppler_path = candidate
+                    break
+        elif pytesseract:
+            tesseract_available = True
+
+    # Pages are OCR'd concurrently (one tesseract per page); tesseract's own
+    # OpenMP threads on top of that only oversubscribe the cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    # MuPDF writes every repair/syntax message of a damaged scan to stderr,
+    # once per object; they stay available in fitz.TOOLS.mupdf_warnings()
+    if fitz is not None:
+        fitz.TOOLS.mupdf_display_errors(False)
+        if hasattr(fitz.TOOLS, "mupdf_display_warnings"):
+            fitz.TOOLS.mupdf_display_warnings(False)
+
+    return tesseract_available, poppler_path
+
+
+# Rasterization for OCR. 300 DPI keeps DNI digits/small form text legible;
+# pages are rendered in grayscale since tesseract binarizes them anyway.
+_OCR_DPI = 300
+# Pages read when no explicit page list is given (digital text and OCR)
+_FALLBACK_PAGES = 3
+# Date separators '.' and '/' -> '-' in one pass
+_DATE_SEP_TRANS = str.maketrans("./", "--")
+
+# Idle tesserocr engines per language. Engines are reused across pages and
+# PDFs; each one serves a single page at a time (they are not thread-safe).
+_TESS_APIS = {}
+_TESS_APIS_LOCK = threading.Lock()
+# Languages tesserocr failed to load (no usable tessdata): later pages go
+# straight to the tesseract CLI instead of retrying the model load each time
+_TESS_INIT_FAILED = set()
+
+
+def _tesserocr_text(image, lang):
+    """OCR one page image with a pooled tesserocr engine (--psm 6).
+
+    Raises RuntimeError if tesserocr cannot load *lang*; the caller falls
+    back to the tesseract CLI.
+    """
+    if lang in _TESS_INIT_FAILED:
+        raise RuntimeError(f"tesserocr could not load {lang}")
+    with _TESS_APIS_LOCK:
+        idle = _TESS_APIS.setdefault(lang, [])
+        api = idle.pop() if idle else None
+    if api is None:
+        try:
+            api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.SINGLE_BLOCK)
+        except RuntimeError:
+            _TESS_INIT_FAILED.add(lang)
+            raise
+    try:
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    finally:
+        with _TESS_APIS_LOCK:
+            _TESS_APIS.setdefault(lang, []).append(api)
+
+
+def _end_tesserocr_engines():
+    """End() the idle pooled tesserocr engines (new ones are made on demand)."""
+    with _TESS_APIS_LOCK:
+        apis = [api for idle in _TESS_APIS.values() for api in idle]
+        _TESS_APIS.clear()
+    for api in apis:
+        api.End()
+
+
+if tesserocr is not None:
+    atexit.register(_end_tesserocr_engines)
+
+
+# Process-wide OCR thread pool, shared by every PDF: concurrent analyses
+# (web requests, batch runs) queue their pages here instead of each starting
+# up to one tesseract per core of its own
+_OCR_POOL = None
+_OCR_POOL_LOCK = threading.Lock()
+
+
+def _ocr_pool():
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is None:
+            _OCR_POOL = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="ocr"
+            )
+        return _OCR_POOL
+
+
+def _forget_ocr_pool():
+    """After fork: the parent's pool threads don't exist in the child."""
+    global _OCR_POOL, _OCR_POOL_LOCK
+    _OCR_POOL = None
+    _OCR_POOL_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_ocr_pool)
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_ocr_lang():
+    """Tesseract language string, resolved once per process.
+
+    Prefer Spanish for ñ/accents; fall back to eng if spa is unavailable.
+    get_languages() spawns tesseract, so it must not run once per PDF.
+    """
+    try:
+        return "spa+eng" if "spa" in pytesseract.get_languages() else "eng"
+    except Exception:
+        return "spa+eng"
+
+
+class _LRUCache:
+    """Small thread-safe LRU for expensive per-PDF results (text, OCR data)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Digests of PDF paths keyed by (path, mtime_ns, size): a file that is
+# analyzed, previewed and renamed is only read and hashed again once it changes
+_PATH_DIGEST_CACHE = _LRUCache(1024)
+
+
+def _pdf_digest(source):
+    """Content fingerprint of a PDF given as path or bytes."""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.blake2b(source, digest_size=16).digest()
+    st = os.stat(source)
+    key = (os.fspath(source), st.st_mtime_ns, st.st_size)
+    digest = _PATH_DIGEST_CACHE.get(key)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with open(source, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                h.update(chunk)
+        digest = h.digest()
+        _PATH_DIGEST_CACHE.put(key, digest)
+    return digest
+
+
+class _WordTape:
+    """OCR words joined by single spaces, with each word's start offset.
+
+    Lets the highlight search locate a value with one str.find over the page
+    and map the hit back to a word index with bisect.
+    """
+
+    __slots__ = ("parts", "text", "starts")
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.text = " ".join(parts)
+        self.starts = []
+        pos = 0
+        for part in parts:
+            self.starts.append(pos)
+            pos += len(part) + 1
+
+    def first_end_word(self, needle):
+        """Index of the word where the first occurrence of *needle* ends."""
+        pos = self.text.find(needle)
+        if pos < 0:
+            return None
+        return bisect.bisect_right(self.starts, pos + len(needle) - 1) - 1
+
+    def last_start_word(self, needle):
+        """Index of the word where the last occurrence of *needle* starts."""
+        pos = self.text.rfind(needle)
+        if pos < 0:
+            return None
+        return bisect.bisect_right(self.starts, pos) - 1
+
+
+# Extracted text keyed by (content digest, pages, use_ocr): re-uploads of the
+# same PDF (retries, reanalyze with another format) skip PyMuPDF/OCR entirely
+_TEXT_CACHE = _LRUCache(256)
+# OCR word boxes of preview pages, keyed by (pixel digest, size, config)
+_OCR_DATA_CACHE = _LRUCache(32)
+# Rendered preview pages (JPEG data URL, size, OCR boxes), keyed by
+# (content digest, page, max_width, kind); highlights are rebuilt per request
+_PREVIEW_PAGE_CACHE = _LRUCache(32)
+# extract_from_filename results by filename: analyze, generate_filename_parts
+# and UI re-renders parse the same names again and again
+_FILENAME_PARTS_CACHE = _LRUCache(4096)
 
 
 class PDFProcessor:
@@ -113,11 +349,13 @@ class PDFProcessor:
             re.IGNORECASE,
         ),
     ]
-    _RE_DATE_ANY = [
-        re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}"),
-        re.compile(r"\d{1,2}\.\d{1,2}\.\d{2,4}"),
-        re.compile(r"\d{4}[/-]\d{1,2}[/-]\d{1,2}"),
-    ]
+    # One alternation, one scan; each format has its own group so callers can
+    # keep the old per-format priority (see _matches_by_alternative)
+    _RE_DATE_ANY = re.compile(
+        r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"
+        r"|(\d{1,2}\.\d{1,2}\.\d{2,4})"
+        r"|(\d{4}[/-]\d{1,2}[/-]\d{1,2})"
+    )
 
     # Matches "DNI: 12345678" and "DNI O CARNET DE EXTRANJERIA 241953936"
     # Also handles OCR variants: "DNI © CARNET" (© misread as O)
@@ -126,19 +364,26 @@ class PDFProcessor:
         r"\bDNI(?:\s+[O©0o]\s+CARNET\s+DE\s+EXTRANJERIA)?\s*[:\-]?\s*(\d{8,12})\b",
         re.IGNORECASE,
     )
-    _RE_DNI_8 = re.compile(r"\b(\d{8})\b")
-    _RE_DNI_9PLUS = re.compile(r"\b(\d{9,12})\b")
+    # Bare digit runs: ASCII mode skips the Unicode digit/word tables (~2x
+    # faster scans); an ID is only ever ASCII digits
+    _RE_DNI_8 = re.compile(r"\b(\d{8})\b", re.ASCII)
+    _RE_DNI_9PLUS = re.compile(r"\b(\d{9,12})\b", re.ASCII)
 
     _EXAM_RE_STR = (
         r"PRE[- ]?OCUPACIONAL|POST[- ]?OCUPACIONAL|PERI[OÓ]DICO"
         r"|ANUAL|INGRESO|EGRESO|RETIRO"
     )
+    _EXAM_LITERALS = ("OCUPACIONAL", "DICO", "ANUAL", "GRESO", "RETIRO")
     _RE_EXAM_CHECKBOX = [
         re.compile(r"(" + _EXAM_RE_STR + r")\s*\|?\s*[xX✓✗☒]\b", re.IGNORECASE),
         re.compile(r"[|]?\s*[xX✓✗☒]\s*\|?\s*(" + _EXAM_RE_STR + r")", re.IGNORECASE),
     ]
+    # [^\S\n] (whitespace but newline) keeps each match on one line, so the
+    # whole text can be scanned at once instead of line by line
     _RE_EXAM_LABELED_LINE = re.compile(
-        r"TIPO\s+DE\s+(?:EXAMEN|EVALUACI[OÓ]N)\s*[:\-]\s*(" + _EXAM_RE_STR + r")",
+        r"TIPO[^\S\n]+DE[^\S\n]+(?:EXAMEN|EVALUACI[OÓ]N)[^\S\n]*[:\-][^\S\n]*("
+        + _EXAM_RE_STR
+        + r")",
         re.IGNORECASE,
     )
     _RE_EXAM_CONTEXTUAL = re.compile(
@@ -166,27 +411,106 @@ class PDFProcessor:
     _RE_COMPANY_OCR_AMP2 = re.compile(r"&\$")
     _RE_COMPANY_OCR_AMP3 = re.compile(r"\s*&\s*")
 
-    _RE_HUDBAY = [
-        re.compile(r"H\s*U\s*D\s*B\s*A\s*Y"),
-        re.compile(r"FOR-SS[O0]-\d{3}"),
-        re.compile(r"FORMATOS\s+PARA\s+LA\s+VALORACI[OÓ]N\s+DE\s+LA\s+APTITUD"),
-        re.compile(r"AUTORIZADO\s+POR\s+HUDBAY"),
-    ]
+    # Hudbay markers in one scan of the original text (no upper() copy).
+    # "AUTORIZADO POR HUDBAY" is already covered by the (spaced) logo branch.
+    _RE_HUDBAY = re.compile(
+        r"H\s*U\s*D\s*B\s*A\s*Y"
+        r"|FOR-SS[O0]-\d{3}"
+        r"|FORMATOS\s+PARA\s+LA\s+VALORACI[OÓ]N\s+DE\s+LA\s+APTITUD",
+        re.IGNORECASE,
+    )
 
     _RE_FILENAME_ILLEGAL = re.compile(r'[<>:"/\\|?*]')
 
+    # Legacy generic extractors (extract_dates / extract_numbers /
+    # extract_entity_names), tried in order
+    _RE_LEGACY_DATES = re.compile(
+        r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})"  # 31/12/2024 o 31-12-2024
+        r"|(\d{4}[/-]\d{1,2}[/-]\d{1,2})"  # 2024/12/31
+        r"|(\d{1,2}\.\d{1,2}\.\d{2,4})"  # 31.12.2025 o 31.12.25
+        r"|(\d{1,2}\s+(?:de\s+)?"
+        r"(?:enero|febrero|marzo|abril|mayo|junio|julio|"
+        r"agosto|septiembre|octubre|noviembre|diciembre)"
+        r"\s+(?:de\s+)?\d{4})",
+        re.IGNORECASE,  # "31 DE ENERO DE 2024" en formularios en mayúsculas
+    )
+    # DNI general; a DNI peruano (8 dígitos) se prefiere, ver extract_numbers
+    _RE_LEGACY_DNI = re.compile(r"DNI\s*[:\-]?\s*(\d+)", re.IGNORECASE)
+    _RE_LEGACY_DNI8 = re.compile(r"DNI\s*[:\-]?\s*(\d{8})", re.IGNORECASE)
+    _RE_LEGACY_NUMBERS = [
+        re.compile(r"(?:N°|Nº|No\.|Número|Number|#)\s*[:\-]?\s*(\d+)", re.IGNORECASE),
+        re.compile(
+            r"(?:Factura|Invoice|Boleta|Recibo|Receipt)\s*[:\-]?\s*[A-Z]?\d+",
+            re.IGNORECASE,
+        ),
+        re.compile(r"(?:RUC|RFC|NIT|CI)\s*[:\-]?\s*\d+", re.IGNORECASE),
+    ]
+    _RE_LEGACY_PERSON = [
+        re.compile(
+            r"(?:APELLIDOS?\s+Y\s+NOMBRES?|NOMBRES?\s+Y\s+APELLIDOS?|NOMBRE|NAME)"
+            r"[:\s]+([A-ZÁÉÍÓÚÑ\s]{10,60})",
+            re.IGNORECASE,
+        ),
+        # 3 palabras (históricamente con IGNORECASE): ambos casos explícitos
+        # en la clase, así sre no hace case-folding por cada carácter
+        re.compile(
+            r"([A-ZÁÉÍÓÚÑa-záéíóúñ]{2,20}\s+[A-ZÁÉÍÓÚÑa-záéíóúñ]{2,20}"
+            r"\s+[A-ZÁÉÍÓÚÑa-záéíóúñ]{2,20})"
+        ),
+    ]
+    _RE_LEGACY_NAME_STRIP = re.compile(r"[^\w\sÁÉÍÓÚÑáéíóúñ]")
+    _RE_LEGACY_COMPANY_STRIP = re.compile(r"[^\w\sÁÉÍÓÚÑáéíóúñ&]")
+    _RE_UPPER_RUN = re.compile(r"[A-ZÁÉÍÓÚÑ]{3,}")
+
+    # detect_document_type: keywords per type, in priority order
+    _DOC_TYPES = {
+        "emoa": [
+            "emoa",
+            "evaluación médica ocupacional",
+            "evaluacion medica ocupacional",
+            "examen médico ocupacional",
+        ],
+        "factura": ["factura", "invoice", "bill"],
+        "recibo": ["recibo", "receipt"],
+        "contrato": ["contrato", "contract", "acuerdo"],
+        "certificado": ["certificado", "certificate", "constancia"],
+        "boleta": ["boleta", "ticket"],
+        "orden": ["orden de compra", "purchase order"],
+        "reporte": ["reporte", "report", "informe"],
+        "licencia": ["licencia de conducir", "licencia"],
+    }
+    _DOC_TYPE_PRIORITY = {doc_type: i for i, doc_type in enumerate(_DOC_TYPES)}
+    # Zero-width lookahead so overlapping keywords are all reported
+    _RE_DOC_TYPE = re.compile(
+        "(?="
+        + "|".join(
+            f"(?P<{doc_type}>{'|'.join(map(re.escape, keywords))})"
+            for doc_type, keywords in _DOC_TYPES.items()
+        )
+        + ")",
+        re.IGNORECASE,
+    )
+    # extract_exam_type: first listed type present anywhere in the text wins
+    _EXAM_TYPES_ORDER = (
+        "PERIODICO",
+        "INGRESO",
+        "EGRESO",
+        "RETIRO",
+        "PREOCUPACIONAL",
+        "POSTOCUPACIONAL",
+    )
+
+    # Output filename shapes (detect_format)
+    _RE_FMT_STANDARD = re.compile(r"^\d{8}-", re.ASCII)
+    _RE_FMT_HUDBAY = re.compile(r"^\d{1,2}\.\d{1,2}\.\d{2,4}\s")
+
+    def __init__(self):
+        _, self._poppler_path = _configure_paths()
+
     @staticmethod
     def _dedupe_keep_order(values):
-        seen = set()
-        out = []
-        for v in values:
-            if not v:
-                continue
-            if v in seen:
-                continue
-            seen.add(v)
-            out.append(v)
-        return out
+        # dict.fromkeys keeps first-seen order and dedupes in C
+        return [v for v in dict.fromkeys(values) if v]
 
     @classmethod
     def _clean_spaces(cls, s: str) -> str:
@@ -201,37 +525,80 @@ class PDFProcessor:
         if not s:
             return ""
         cleaned = cls._RE_NORM_DATE_STRIP.sub("", s.strip())
-        cleaned = cleaned.replace(".", "-").replace("/", "-")
+        cleaned = cleaned.translate(_DATE_SEP_TRANS)
         cleaned = cls._RE_NORM_DATE_MULTI_DASH.sub("-", cleaned)
         return cleaned.strip("-")
 
+    @staticmethod
+    def _open_pdf(source):
+        """Open a PDF given a file path or its raw bytes."""
+        if isinstance(source, (bytes, bytearray)):
+            return fitz.open(stream=source, filetype="pdf")
+        return fitz.open(source)
+
+    @staticmethod
+    def _convert_pdf_pages(source, **kwargs):
+        """pdf2image conversion for a file path or raw bytes."""
+        if isinstance(source, (bytes, bytearray)):
+            return convert_from_bytes(source, **kwargs)
+        return convert_from_path(source, **kwargs)
+
     def extract_text_from_pdf(self, pdf_path, use_ocr=True, verbose=False, pages=None):
-        """Extrae texto de PDF (digital o escaneado).
+        """Extrae texto de PDF (digital o escaneado), con cache por contenido.
 
         Args:
+            pdf_path: Ruta al PDF o su contenido en bytes.
             pages: Optional list of 0-indexed page numbers to extract from.
-                   If None, extracts from all pages (original behavior).
+                   If None, extracts from the first 3 pages.
         """
-        text = ""
+        try:
+            cache_key = (
+                _pdf_digest(pdf_path),
+                tuple(pages) if pages is not None else None,
+                bool(use_ocr),
+            )
+        except (OSError, TypeError):
+            cache_key = None
+        if cache_key is not None:
+            cached = _TEXT_CACHE.get(cache_key)
+            if cached is not None:
+                if verbose:
+                    print("  [INFO] Texto recuperado de cache")
+                return cached
+
+        text = self._extract_text_uncached(pdf_path, use_ocr, verbose, pages)
+        # Empty results may be transient (OCR failure); don't pin them
+        if text and cache_key is not None:
+            _TEXT_CACHE.put(cache_key, text)
+        return text
+
+    def _extract_text_uncached(self, pdf_path, use_ocr, verbose, pages):
+        """Extracción real (digital, luego OCR); ver extract_text_from_pdf."""
+        parts = []
 
         # Intenta extraer texto digital primero
         if fitz is not None:
             try:
-                doc = fitz.open(pdf_path)
-                if pages is not None:
-                    for page_num in pages:
-                        if page_num < len(doc):
-                            text += doc[page_num].get_text()
-                    if verbose:
-                        print(
-                            f"  [INFO] Extrayendo texto digital de paginas: {[p+1 for p in pages]}"
-                        )
-                else:
-                    for page in doc:
-                        text += page.get_text()
-                doc.close()
+                # Closed even if a damaged page makes get_text() raise
+                with self._open_pdf(pdf_path) as doc:
+                    if pages is not None:
+                        for page_num in pages:
+                            if page_num < len(doc):
+                                parts.append(doc[page_num].get_text())
+                        if verbose:
+                            shown = [p + 1 for p in pages]
+                            print(
+                                f"  [INFO] Extrayendo texto digital de paginas: {shown}"
+                            )
+                    else:
+                        # Same window as the OCR fallback: the fields we look
+                        # for are on the first pages, long reports don't need
+                        # a full read
+                        for page_num in range(min(len(doc), _FALLBACK_PAGES)):
+                            parts.append(doc[page_num].get_text())
 
                 # Si hay suficiente texto, no necesita OCR
+                text = "".join(parts)
                 if len(text.strip()) > 50:
                     return text
             except Exception as e:
@@ -239,7 +606,7 @@ class PDFProcessor:
                     print(f"  [WARN] Error extrayendo texto digital: {e}")
 
         # Si no hay texto o es muy poco, usa OCR
-        if use_ocr and pytesseract is not None and convert_from_path is not None:
+        if use_ocr and self._can_ocr():
             if verbose:
                 print(f"  [OCR] Aplicando OCR (documento escaneado)...")
             try:
@@ -247,44 +614,49 @@ class PDFProcessor:
                     # Convert only specific pages
                     images = []
                     for page_num in pages:
-                        page_images = convert_from_path(
+                        page_images = self._render_pages(
                             pdf_path,
-                            first_page=page_num + 1,  # pdf2image uses 1-indexed
-                            last_page=page_num + 1,
-                            dpi=300,
-                            poppler_path=_POPPLER_PATH,
+                            page_num + 1,  # 1-indexed, like pdf2image
+                            page_num + 1,
+                            dpi=_OCR_DPI,
+                            grayscale=True,
                         )
                         images.extend(page_images)
                     if verbose:
                         print(f"  [INFO] OCR de paginas: {[p+1 for p in pages]}")
+                    ocr_texts = self._ocr_images(images)
                 else:
-                    images = convert_from_path(
-                        pdf_path,
-                        first_page=1,
-                        last_page=3,
-                        dpi=300,
-                        poppler_path=_POPPLER_PATH,
-                    )  # Solo primeras 3 páginas (fallback)
+                    # Page 1 first: a Hudbay form has every field there, so
+                    # pages 2..N are only rasterized and OCR'd when page 1 is
+                    # not Hudbay or lacks the DNI or date. Standard-layout
+                    # patient data (name, company, exam) is on page 2.
+                    images = self._render_pages(
+                        pdf_path, 1, 1, dpi=_OCR_DPI, grayscale=True
+                    )
+                    ocr_texts = self._ocr_images(images)
+                    first_text = "".join(ocr_texts)
+                    if _FALLBACK_PAGES > 1 and not (
+                        self.detect_format_from_content(first_text) == "hudbay"
+                        and self.extract_numbers(first_text)
+                        and self.extract_dates(first_text)
+                    ):
+                        more = self._render_pages(
+                            pdf_path,
+                            2,
+                            _FALLBACK_PAGES,
+                            dpi=_OCR_DPI,
+                            grayscale=True,
+                            thread_count=_FALLBACK_PAGES - 1,  # one per page
+                        )
+                        images += more
+                        ocr_texts += self._ocr_images(more)
                 if verbose:
                     print(f"  [OK] PDF convertido a {len(images)} imagenes")
 
-                # Then apply OCR to each image (requires Tesseract)
-                # Prefer Spanish for ñ/accents; fall back to eng if spa unavailable
-                ocr_lang = "spa+eng"
-                try:
-                    available = pytesseract.get_languages()
-                    if "spa" not in available:
-                        ocr_lang = "eng"
-                except Exception:
-                    pass
-                # --psm 6: assume uniform block of text (best for form documents)
-                ocr_config = "--psm 6"
-                for i, image in enumerate(images):
-                    ocr_text = pytesseract.image_to_string(
-                        image, lang=ocr_lang, config=ocr_config
-                    )
-                    text += ocr_text
-                    if verbose:
+                parts.extend(ocr_texts)
+                if verbose:
+                    # Log after the join so page messages don't interleave
+                    for i, ocr_text in enumerate(ocr_texts):
                         print(
                             f"  [OK] OCR pagina {i+1}: {len(ocr_text)} caracteres extraidos"
                         )
@@ -296,40 +668,93 @@ class PDFProcessor:
                     traceback.print_exc()
                 return ""
 
-        return text
+        return "".join(parts)
 
-    def extract_dates(self, text):
-        """Extrae fechas del texto"""
-        date_patterns = [
-            r"\d{1,2}[/-]\d{1,2}[/-]\d{2,4}",  # 31/12/2024 o 31-12-2024
-            r"\d{4}[/-]\d{1,2}[/-]\d{1,2}",  # 2024/12/31
-            r"\d{1,2}\.\d{1,2}\.\d{2,4}",  # 31.12.2025 o 31.12.25
-            r"\d{1,2}\s+(?:de\s+)?"
-            r"(?:enero|febrero|marzo|abril|mayo|junio|julio|"
-            r"agosto|septiembre|octubre|noviembre|diciembre)"
-            r"\s+(?:de\s+)?\d{4}",
-        ]
+    # A page with fewer ink pixels than 1/_BLANK_PAGE_INK_RATIO of its area
+    # is blank (scanner backs, separator sheets; dust specks are tolerated)
+    _BLANK_PAGE_INK_RATIO = 20000
+    # Ink = pixels at least this many gray levels away from the page's own
+    # background, so faint print (gray text, toner saver, grayish paper) still
+    # counts while scanner noise around the background level does not
+    _BLANK_PAGE_MIN_CONTRAST = 64
+
+    @classmethod
+    def _is_blank_page(cls, image):
+        """True if a rendered page has (almost) no ink, so OCR would be wasted."""
+        gray = image if image.mode == "L" else image.convert("L")
+        hist = gray.histogram()
+        background = max(range(256), key=hist.__getitem__)
+        margin = cls._BLANK_PAGE_MIN_CONTRAST
+        ink = sum(hist[: max(0, background - margin + 1)])
+        ink += sum(hist[background + margin :])
+        return ink * cls._BLANK_PAGE_INK_RATIO < gray.width * gray.height
+
+    @classmethod
+    def _ocr_images(cls, images):
+        """pytesseract text of each page image, in order ("" for blank pages)."""
+        ocr_lang = _resolve_ocr_lang()
+        # --psm 6: assume uniform block of text (best for form documents)
+        ocr_config = "--psm 6"
+
+        def _ocr(image):
+            # Per-page early exit: one histogram pass instead of a tesseract run
+            if cls._is_blank_page(image):
+                return ""
+            if tesserocr is not None:
+                try:
+                    return _tesserocr_text(image, ocr_lang)
+                except RuntimeError:
+                    pass  # no usable tessdata for tesserocr; use the CLI
+            return pytesseract.image_to_string(image, lang=ocr_lang, config=ocr_config)
 
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            dates.extend(matches)
+        if len(images) > 1:
+            # Pages run concurrently: each on its own tesseract process, or
+            # its own tesserocr engine (which releases the GIL)
+            return list(_ocr_pool().map(_ocr, images))
+        return [_ocr(image) for image in images]
 
-        # Prefiere fechas más recientes o las que aparecen primero
-        return dates[0] if dates else None
+    @staticmethod
+    def _matches_by_alternative(regex, text):
+        """Single finditer over a fused ``(a)|(b)|...`` regex.
+
+        Matches are grouped by the alternative that produced them, in pattern
+        order. Unlike running each pattern's findall in turn, matches never
+        overlap: text consumed by one alternative is not rescanned by the
+        others (e.g. "2024-01-15" no longer also yields "24-01-15").
+        """
+        buckets = [[] for _ in range(regex.groups)]
+        for m in regex.finditer(text):
+            buckets[m.lastindex - 1].append(m.group(m.lastindex))
+        return [d for bucket in buckets for d in bucket]
+
+    def extract_dates(self, text):
+        """Extrae fechas del texto"""
+        # Prefiere el primer formato de la lista, y dentro de él la fecha que
+        # aparece primero: same answer as _matches_by_alternative(...)[0], but
+        # the scan stops at the first DD/MM/YYYY-style hit
+        best = None
+        for m in self._RE_LEGACY_DATES.finditer(text):
+            if m.lastindex == 1:
+                return m.group(1)
+            if best is None or m.lastindex < best.lastindex:
+                best = m
+        return best.group(best.lastindex) if best else None
 
     def extract_numbers(self, text):
         """Extrae números de referencia, factura, DNI, etc."""
-        patterns = [
-            r"DNI\s*[:\-]?\s*(\d{8})",  # DNI peruano (8 dígitos)
-            r"DNI\s*[:\-]?\s*(\d+)",  # DNI general
-            r"(?:N°|Nº|No\.|Número|Number|#)\s*[:\-]?\s*(\d+)",
-            r"(?:Factura|Invoice|Boleta|Recibo|Receipt)\s*[:\-]?\s*[A-Z]?\d+",
-            r"(?:RUC|RFC|NIT|CI)\s*[:\-]?\s*\d+",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # DNI peruano primero, luego DNI general. Any 8-digit DNI match is also
+        # a general match, so one general search decides both: no match means
+        # neither applies, and an 8+ digit first hit is the 8-digit answer.
+        match = self._RE_LEGACY_DNI.search(text)
+        if match:
+            digits = match.group(1)
+            if len(digits) >= 8:
+                return digits[:8]
+            dni8 = self._RE_LEGACY_DNI8.search(text, match.start() + 1)
+            return dni8.group(1) if dni8 else digits
+
+        for pattern in self._RE_LEGACY_NUMBERS:
+            match = pattern.search(text)
             if match:
                 # Si capturó un grupo, usa ese; si no, usa todo el match
                 result = match.group(1) if match.lastindex else match.group(0)
@@ -339,19 +764,10 @@ class PDFProcessor:
 
     def extract_entity_names(self, text):
         """Extrae nombres de empresas o personas"""
-        lines = text.split("\n")[:30]  # Primeras 30 líneas
-
-        # Patrones para nombres de personas (apellidos y nombres)
-        person_patterns = [
-            r"(?:APELLIDOS?\s+Y\s+NOMBRES?|NOMBRES?\s+Y\s+APELLIDOS?|NOMBRE|NAME)"
-            r"[:\s]+([A-ZÁÉÍÓÚÑ\s]{10,60})",
-            # 3 palabras en mayúsculas
-            r"([A-ZÁÉÍÓÚÑ]{2,20}\s+[A-ZÁÉÍÓÚÑ]{2,20}\s+[A-ZÁÉÍÓÚÑ]{2,20})",
-        ]
-
-        # Busca nombres de personas primero
-        for pattern in person_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # Busca nombres de personas primero (the 3-word pattern matches almost
+        # any text, so the line split below is rarely needed)
+        for pattern in self._RE_LEGACY_PERSON:
+            match = pattern.search(text)
             if match:
                 name = (
                     match.group(1).strip()
@@ -359,18 +775,19 @@ class PDFProcessor:
                     else match.group(0).strip()
                 )
                 # Limpia y valida
-                clean_name = re.sub(r"[^\w\sÁÉÍÓÚÑáéíóúñ]", "", name)
+                clean_name = self._RE_LEGACY_NAME_STRIP.sub("", name)
                 if 10 < len(clean_name) < 60 and len(clean_name.split()) >= 2:
                     return clean_name.strip()
 
-        # Si no encuentra persona, busca empresas
-        for line in lines:
+        # Si no encuentra persona, busca empresas en las primeras 30 líneas
+        for line in text.split("\n", 30)[:30]:
             line = line.strip()
-            # Busca líneas con palabras en mayúsculas (empresas)
-            if 5 < len(line) < 80 and any(c.isupper() for c in line):
-                # Evita líneas que son solo números o fechas
-                if re.search(r"[A-ZÁÉÍÓÚÑ]{3,}", line):
-                    clean_name = re.sub(r"[^\w\sÁÉÍÓÚÑáéíóúñ&]", "", line)
+            # Busca líneas con palabras en mayúsculas (empresas); una corrida
+            # de 3+ mayúsculas ya implica que hay mayúsculas y evita líneas
+            # que son solo números o fechas
+            if 5 < len(line) < 80:
+                if self._RE_UPPER_RUN.search(line):
+                    clean_name = self._RE_LEGACY_COMPANY_STRIP.sub("", line)
                     if clean_name and 5 < len(clean_name) < 80:
                         # Limita a palabras razonables
                         words = clean_name.split()
@@ -381,48 +798,24 @@ class PDFProcessor:
 
     def detect_document_type(self, text):
         """Detecta el tipo de documento"""
-        text_lower = text.lower()
-
-        doc_types = {
-            "emoa": [
-                "emoa",
-                "evaluación médica ocupacional",
-                "evaluacion medica ocupacional",
-                "examen médico ocupacional",
-            ],
-            "factura": ["factura", "invoice", "bill"],
-            "recibo": ["recibo", "receipt"],
-            "contrato": ["contrato", "contract", "acuerdo"],
-            "certificado": ["certificado", "certificate", "constancia"],
-            "boleta": ["boleta", "ticket"],
-            "orden": ["orden de compra", "purchase order"],
-            "reporte": ["reporte", "report", "informe"],
-            "licencia": ["licencia de conducir", "licencia"],
-        }
-
-        for doc_type, keywords in doc_types.items():
-            if any(keyword in text_lower for keyword in keywords):
-                return doc_type.upper() if doc_type == "emoa" else doc_type.capitalize()
-
-        return None
+        # Every keyword hit in one scan; the earliest type in _DOC_TYPES wins,
+        # same as checking the types one by one
+        best = None
+        for m in self._RE_DOC_TYPE.finditer(text):
+            priority = self._DOC_TYPE_PRIORITY[m.lastgroup]
+            if best is None or priority < best[0]:
+                best = (priority, m.lastgroup)
+                if priority == 0:
+                    break
+        if best is None:
+            return None
+        doc_type = best[1]
+        return doc_type.upper() if doc_type == "emoa" else doc_type.capitalize()
 
     def extract_exam_type(self, text):
         """Extrae tipo de examen médico (PERIODICO, INGRESO, etc.)"""
         text_upper = text.upper()
-        exam_types = [
-            "PERIODICO",
-            "INGRESO",
-            "EGRESO",
-            "RETIRO",
-            "PREOCUPACIONAL",
-            "POSTOCUPACIONAL",
-        ]
-
-        for exam_type in exam_types:
-            if exam_type in text_upper:
-                return exam_type
-
-        return None
+        return next((t for t in self._EXAM_TYPES_ORDER if t in text_upper), None)
 
     def extract_date_candidates(self, text: str):
         """Devuelve lista de fechas (normalizadas) encontradas en el texto.
@@ -432,19 +825,17 @@ class PDFProcessor:
             return []
 
         # 1. Try labeled dates first (highest priority)
-        labeled_dates = []
-        for pat in self._RE_DATE_LABELED:
-            for m in pat.finditer(text):
-                labeled_dates.append(self._normalize_date(m.group(1)))
+        labeled_dates = (
+            m.group(1) for pat in self._RE_DATE_LABELED for m in pat.finditer(text)
+        )
 
         # 2. All dates as fallback
-        all_dates = []
-        for pat in self._RE_DATE_ANY:
-            all_dates.extend(pat.findall(text))
+        all_dates = self._matches_by_alternative(self._RE_DATE_ANY, text)
 
-        # Labeled dates first, then all others
-        combined = labeled_dates + [self._normalize_date(d) for d in all_dates]
-        return self._dedupe_keep_order(combined)
+        # Labeled dates first, then all others (normalized as they stream in)
+        return self._dedupe_keep_order(
+            map(self._normalize_date, itertools.chain(labeled_dates, all_dates))
+        )
 
     def extract_dni_candidates(self, text: str):
         """Devuelve lista de posibles DNI/carnet encontrados en el texto.
@@ -489,7 +880,7 @@ class PDFProcessor:
         "RETIRO": "RETIRO",
     }
 
-    def extract_exam_type_candidates(self, text: str):
+    def extract_exam_type_candidates(self, text: str, text_upper=None):
         """Devuelve lista de tipos de examen encontrados en el texto.
 
         Prioritizes:
@@ -497,9 +888,16 @@ class PDFProcessor:
         2. Checkbox-style forms where 'x' marks the selected type
         3. Contextual phrases like 'EXAMEN MÉDICO PERIODICO'
         4. Fallback: any exam type keyword found in text
+
+        ``text_upper`` is an optional precomputed ``text.upper()``.
         """
         if not text:
             return []
+        upper = text_upper if text_upper is not None else text.upper()
+        # Todas las variantes de _EXAM_RE_STR contienen alguno de estos
+        # literales: sin ninguno, ni los regex ni el fallback pueden encontrar
+        if not any(lit in upper for lit in self._EXAM_LITERALS):
+            return []
 
         prioritized = []
 
@@ -512,11 +910,10 @@ class PDFProcessor:
                     prioritized.append(canonical)
 
         # 2. Labeled on same line: "TIPO DE EXAMEN: PREOCUPACIONAL"
-        for line in text.split("\n"):
-            for match in self._RE_EXAM_LABELED_LINE.findall(line):
-                canonical = self._EXAM_LABEL_MAP.get(match.upper().strip())
-                if canonical:
-                    prioritized.append(canonical)
+        for match in self._RE_EXAM_LABELED_LINE.findall(text):
+            canonical = self._EXAM_LABEL_MAP.get(match.upper().strip())
+            if canonical:
+                prioritized.append(canonical)
 
         # 3. Contextual: "EXAMEN MÉDICO PERIODICO"
         for match in self._RE_EXAM_CONTEXTUAL.findall(text):
@@ -528,7 +925,6 @@ class PDFProcessor:
             return self._dedupe_keep_order(prioritized)
 
         # 4. Fallback: any exam type keyword in text
-        upper = text.upper()
         normalized = (
             upper.replace("PRE-OCUPACIONAL", "PREOCUPACIONAL")
             .replace("POST-OCUPACIONAL", "POSTOCUPACIONAL")
@@ -547,67 +943,70 @@ class PDFProcessor:
         return self._dedupe_keep_order(found)
 
     # Words that should not appear in a person's name (noise from OCR)
-    _NAME_NOISE_WORDS = {
-        "AREA",
-        "DNI",
-        "CARGO",
-        "PUESTO",
-        "FECHA",
-        "EMPRESA",
-        "RUC",
-        "TELEFONO",
-        "CELULAR",
-        "CORREO",
-        "EMAIL",
-        "DIRECCION",
-        "DISTRITO",
-        "PROVINCIA",
-        "DEPARTAMENTO",
-        "PERU",
-        "LIMA",
-        "CARNET",
-        "EXTRANJERIA",
-        "DOCUMENTO",
-        "IDENTIDAD",
-        "TRABAJADOR",
-        "PACIENTE",
-        "EVALUADO",
-        "EXAMINADO",
-        "CONTRATA",
-        "CONTRATISTA",
-        "SAC",
-        "SRL",
-        "EIRL",
-        "OCUPACIONAL",
-        "MEDICO",
-        "EXAMEN",
-        "RESULTADO",
-        "INGRESO",
-        "EGRESO",
-        "PERIODICO",
-        "PREOCUPACIONAL",
-        "POSTOCUPACIONAL",
-        "RETIRO",
-        "TIPO",
-        "EVALUACION",
-        "FORMATOS",
-        "PARA",
-        "CONSENTIMIENTO",
-        "INFORMADO",
-        "NUMERO",
-        "PASAPORTE",
-        "SERVICIOS",
-        "LOGISTICA",
-        "INFORME",
-        "LLENADO",
-    }
+    _NAME_NOISE_WORDS = frozenset(
+        {
+            "AREA",
+            "DNI",
+            "CARGO",
+            "PUESTO",
+            "FECHA",
+            "EMPRESA",
+            "RUC",
+            "TELEFONO",
+            "CELULAR",
+            "CORREO",
+            "EMAIL",
+            "DIRECCION",
+            "DISTRITO",
+            "PROVINCIA",
+            "DEPARTAMENTO",
+            "PERU",
+            "LIMA",
+            "CARNET",
+            "EXTRANJERIA",
+            "DOCUMENTO",
+            "IDENTIDAD",
+            "TRABAJADOR",
+            "PACIENTE",
+            "EVALUADO",
+            "EXAMINADO",
+            "CONTRATA",
+            "CONTRATISTA",
+            "SAC",
+            "SRL",
+            "EIRL",
+            "OCUPACIONAL",
+            "MEDICO",
+            "EXAMEN",
+            "RESULTADO",
+            "INGRESO",
+            "EGRESO",
+            "PERIODICO",
+            "PREOCUPACIONAL",
+            "POSTOCUPACIONAL",
+            "RETIRO",
+            "TIPO",
+            "EVALUACION",
+            "FORMATOS",
+            "PARA",
+            "CONSENTIMIENTO",
+            "INFORMADO",
+            "NUMERO",
+            "PASAPORTE",
+            "SERVICIOS",
+            "LOGISTICA",
+            "INFORME",
+            "LLENADO",
+        }
+    )
 
     def _clean_person_name(self, raw: str) -> str:
         """Clean a raw person name: remove noise words, limit to 5 words."""
-        words = self._clean_spaces(raw).split()
+        # One upper() for the whole string; split() already collapses whitespace
+        words = (raw or "").upper().split()
         clean = []
         for w in words:
-            w_upper = w.upper().strip(".,;:()")
+            w_upper = w.strip(".,;:()")
             if w_upper in self._NAME_NOISE_WORDS:
                 break  # stop at first noise word
             if len(w_upper) < 2:
@@ -673,11 +1072,16 @@ class PDFProcessor:
         words = words[:5]
         return " ".join(words)
 
-    def extract_company_candidates(self, text: str):
-        """Devuelve lista de posibles empresas encontradas en el texto."""
+    def extract_company_candidates(self, text: str, text_upper=None):
+        """Devuelve lista de posibles empresas encontradas en el texto.
+
+        ``text_upper`` is an optional precomputed ``text.upper()``.
+        """
         if not text:
             return []
         candidates = []
+        if text_upper is None:
+            text_upper = text.upper()
 
         for m in self._RE_COMPANY_LABELED.finditer(text):
             raw = m.group(1).split("\n", 1)[0].strip()
@@ -686,7 +1090,8 @@ class PDFProcessor:
                 candidates.append(cleaned)
 
         # Heurística: líneas con CONSORCIO
-        for line in text.split("\n")[:80]:
+        lines = text.split("\n", 80)[:80] if "CONSORCIO" in text_upper else ()
+        for line in lines:
             ln = self._clean_spaces(line)
             if not ln:
                 continue
@@ -712,7 +1117,7 @@ class PDFProcessor:
         """Convert normalized date (DD-MM-YYYY) to short format (DD.MM.YY)."""
         if not date_str:
             return ""
-        parts = date_str.replace("/", "-").replace(".", "-").split("-")
+        parts = date_str.translate(_DATE_SEP_TRANS).split("-")
         if len(parts) != 3:
             return date_str.replace("-", ".")
         dd, mm, yy = parts[0], parts[1], parts[2]
@@ -810,14 +1215,10 @@ class PDFProcessor:
         """
         if not text:
             return None
-        upper = text.upper()
-        for pat in cls._RE_HUDBAY:
-            if pat.search(upper):
-                return "hudbay"
-        return None
+        return "hudbay" if cls._RE_HUDBAY.search(text) else None
 
-    @staticmethod
-    def detect_format(filename):
+    @classmethod
+    def detect_format(cls, filename):
         """Detect if a filename matches Hudbay or Standard format.
 
         Hudbay:   starts with date (DD.MM.YY), spaces between fields
@@ -827,16 +1228,25 @@ class PDFProcessor:
         """
         if not filename:
             return None
-        name = filename.rsplit(".pdf", 1)[0].rsplit(".PDF", 1)[0].strip()
+        return cls._detect_format_name(cls._filename_stem(filename))
+
+    @staticmethod
+    def _filename_stem(filename):
+        """Filename without its .pdf/.PDF extension, stripped."""
+        return filename.rsplit(".pdf", 1)[0].rsplit(".PDF", 1)[0].strip()
+
+    @classmethod
+    def _detect_format_name(cls, name):
+        """detect_format for a name already passed through _filename_stem."""
         if not name:
             return None
 
         # Standard: starts with 8-digit DNI, uses hyphens, contains CMESPINAR
-        if re.match(r"^\d{8}-", name) and "CMESPINAR" in name.upper():
+        if cls._RE_FMT_STANDARD.match(name) and "CMESPINAR" in name.upper():
             return "standard"
 
         # Hudbay: starts with date DD.MM.YY, uses spaces
-        if re.match(r"^\d{1,2}\.\d{1,2}\.\d{2,4}\s", name):
+        if cls._RE_FMT_HUDBAY.match(name):
             return "hudbay"
 
         return None
@@ -1012,6 +1422,23 @@ class PDFProcessor:
             return best_entry, best_ratio
         return None, 0.0
 
+    def _extract_candidates(self, text):
+        """Run every field extractor on *text*: (dni, nombre, empresa, tipo, fecha).
+
+        Deliberately sequential: CPython's ``re`` holds the GIL while matching,
+        so a thread per extractor would only add scheduling overhead. Batches
+        get their parallelism one level up, one PDF per worker.
+        """
+        # Una sola copia en mayúsculas para todos los extractores
+        text_upper = text.upper()
+        return (
+            self.extract_dni_candidates(text),
+            self.extract_person_name_candidates(text),
+            self.extract_company_candidates(text, text_upper),
+            self.extract_exam_type_candidates(text, text_upper),
+            self.extract_date_candidates(text),
+        )
+
     def analyze(
         self,
         pdf_path,
@@ -1025,9 +1452,7 @@ class PDFProcessor:
         forced_format: If set ('hudbay' or 'standard'), skip auto-detection and use this format.
         """
         if verbose:
-            ocr_status = (
-                "disponible" if (pytesseract and convert_from_path) else "NO disponible"
-            )
+            ocr_status = "disponible" if self._can_ocr() else "NO disponible"
             print(f"  [INFO] OCR {ocr_status}")
 
         # Determine page-specific extraction based on format
@@ -1072,11 +1497,7 @@ class PDFProcessor:
         )
 
         # candidatos desde texto
-        dni_c = self.extract_dni_candidates(text)
-        nombre_c = self.extract_person_name_candidates(text)
-        empresa_c = self.extract_company_candidates(text)
-        tipo_c = self.extract_exam_type_candidates(text)
-        fecha_c = self.extract_date_candidates(text)
+        dni_c, nombre_c, empresa_c, tipo_c, fecha_c = self._extract_candidates(text)
 
         # merge con filename_data (fallback)
         if filename_data.get("dni"):
@@ -1092,18 +1513,14 @@ class PDFProcessor:
 
         candidates = {
             "dni": self._dedupe_keep_order(dni_c),
-            "nombre": self._dedupe_keep_order(
-                [self._clean_spaces(x) for x in nombre_c]
-            ),
+            "nombre": self._dedupe_keep_order(self._clean_spaces(x) for x in nombre_c),
             "empresa": self._dedupe_keep_order(
-                [self._clean_spaces(x) for x in empresa_c]
+                self._clean_spaces(x) for x in empresa_c
             ),
             "tipo_examen": self._dedupe_keep_order(
-                [self._clean_spaces(x).upper() for x in tipo_c]
-            ),
-            "fecha": self._dedupe_keep_order(
-                [self._normalize_date(x) for x in fecha_c]
+                self._clean_spaces(x).upper() for x in tipo_c
             ),
+            "fecha": self._dedupe_keep_order(map(self._normalize_date, fecha_c)),
         }
 
         # Excel cross-reference: lookup returns {dni: {"paciente", "hudbay_name", "standard_name"}}
@@ -1143,7 +1560,7 @@ class PDFProcessor:
                     pac_clean = self._clean_spaces(pac_name)
                     # Always prepend the Excel paciente name as the top candidate
                     candidates["nombre"] = self._dedupe_keep_order(
-                        [pac_clean] + candidates["nombre"]
+                        itertools.chain((pac_clean,), candidates["nombre"])
                     )
                     if verbose:
                         src = (
@@ -1225,17 +1642,318 @@ class PDFProcessor:
             "excel_dni_found": excel_dni_found,
         }
 
+    def warmup(self):
+        """Run one analysis on a tiny in-memory PDF so the first request is fast.
+
+        Loads PyMuPDF's fonts/tables and exercises every extraction pattern.
+        Best-effort: does nothing if PyMuPDF is missing or anything fails.
+        """
+        if fitz is None:
+            return
+        try:
+            doc = fitz.open()
+            page = doc.new_page()
+            lines = (
+                "CERTIFICADO DE APTITUD MEDICO OCUPACIONAL",
+                "Apellidos y Nombres: PEREZ GARCIA JUAN",
+                "DNI: 12345678",
+                "Empresa: EMPRESA DEMO S.A.C.",
+                "Fecha de Evaluacion: 01/01/2025",
+                "Tipo de Examen: PERIODICO",
+            )
+            for i, line in enumerate(lines):
+                page.insert_text((40, 72 + 14 * i), line, fontsize=10)
+            data = doc.tobytes()
+            doc.close()
+            # Single-page document: the Hudbay layout reads page 1
+            self.analyze(data, original_filename="warmup.pdf", forced_format="hudbay")
+        except Exception as e:
+            print(f"[WARN] Warmup failed: {e}")
+
+    def close(self):
+        """Free the idle tesserocr engines (also done at interpreter exit).
+
+        The engines are shared by every processor in the process; OCR after
+        close() simply loads new ones.
+        """
+        _end_tesserocr_engines()
+
+    @staticmethod
+    def list_pdfs(folder):
+        """Paths of the PDF files directly inside *folder*, sorted by name.
+
+        One os.scandir pass (file type comes from the directory entry, no
+        stat per file); ".pdf" is matched case-insensitively, so scanner
+        output named ".PDF" is included.
+        """
+        with os.scandir(folder) as it:
+            return sorted(
+                e.path
+                for e in it
+                if e.name.lower().endswith(".pdf") and e.is_file(follow_symlinks=False)
+            )
+
+    def analyze_many(self, paths, workers=None, verbose=False, timeout=None, **kwargs):
+        """Analyze several PDF paths, one worker process per PDF.
+
+        Regex/OCR post-processing is pure Python and holds the GIL, so a batch
+        only scales across processes. Extra kwargs go to analyze(); the
+        original filename defaults to each path's basename. A PDF taking more
+        than *timeout* seconds is abandoned with
+        {"success": False, "suggested_name": None, "error": "timeout"}; with a
+        timeout, a PDF whose worker process dies (a crashing parser) gets
+        "error": "crashed" instead of ending the batch.
+
+        Returns {path: analysis}, in the order of *paths*.
+        """
+        return self._map_pdfs(
+            _analyze_one,
+            paths,
+            workers,
+            verbose,
+            kwargs,
+            timeout=timeout,
+            on_timeout={"success": False, "suggested_name": None, "error": "timeout"},
+            on_crash={"success": False, "suggested_name": None, "error": "crashed"},
+        )
+
+    def generate_filenames_many(
+        self, paths, workers=None, verbose=False, cache_file=None, timeout=None
+    ):
+        """generate_filename_parts for several PDF paths, spread over worker
+        processes like analyze_many; each path's basename is passed as the
+        original filename. A PDF taking more than *timeout* seconds, or
+        crashing its worker process, gets (None, None), like one whose name
+        could not be generated.
+
+        With *cache_file* (a JSON path), results are remembered across runs by
+        content digest + basename, so re-running over the same folder only
+        hashes the PDFs it already named.
+
+        Returns {path: (new_name, metadata)}, in the order of *paths*.
+        """
+        paths = list(paths)
+
+        def run(batch):
+            return self._map_pdfs(
+                _filename_parts_one,
+                batch,
+                workers,
+                verbose,
+                timeout=timeout,
+                on_timeout=(None, None),
+                on_crash=(None, None),
+            )
+
+        if not cache_file:
+            return run(paths)
+
+        cache = self._load_json_cache(cache_file)
+        keys = {p: f"{_pdf_digest(p).hex()}:{os.path.basename(p)}" for p in paths}
+        todo = [p for p in paths if keys[p] not in cache]
+        fresh = run(todo)
+        if fresh:
+            # Only successful names are cached; failures are retried next run
+            cache.update({keys[p]: r for p, r in fresh.items() if r[0]})
+            self._save_json_cache(cache_file, cache)
+        return {p: fresh[p] if p in fresh else tuple(cache[keys[p]]) for p in paths}
+
+    @staticmethod
+    def _load_json_cache(cache_file):
+        """Read a results cache written by _save_json_cache ({} if unusable)."""
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @staticmethod
+    def _save_json_cache(cache_file, cache):
+        """Write the cache atomically: a crash mid-write keeps the old file."""
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"[WARN] Could not write cache {cache_file}: {e}")
+
+    @staticmethod
+    def _default_workers():
+        """Process count for batch runs: one per core, divided by tesseract's
+        own OpenMP threads when OMP_THREAD_LIMIT was raised above 1."""
+        cores = os.cpu_count() or 2
+        omp = os.environ.get("OMP_THREAD_LIMIT", "1")
+        if omp.isdigit() and int(omp) > 1:
+            return max(1, cores // int(omp))
+        return cores
+
+    def _map_pdfs(
+        self, task, paths, workers, *args, timeout=None, on_timeout=None, on_crash=None
+    ):
+        """Run task(path, *args, processor) for every path.
+
+        One worker runs inline on this processor; otherwise a process pool
+        runs it, each process reusing its own PDFProcessor (compiled patterns
+        and caches are built once per process, not per PDF).
+
+        With *timeout* (seconds per PDF) tasks always run in worker processes.
+        The deadline counts from when a worker is handed the PDF; a PDF still
+        running after that gets *on_timeout* as its result and only its worker
+        is killed (and replaced), so one pathological file can't hang the
+        batch and the other PDFs in flight are not restarted. A PDF whose
+        worker dies (segfault in a parser, OOM kill) likewise gets *on_crash*
+        and the worker is replaced; the batch goes on.
+        """
+        paths = list(paths)
+        workers = min(workers or self._default_workers(), len(paths) or 1)
+        if timeout is not None and paths:
+            return self._map_pdfs_timeout(
+                task, paths, workers, args, timeout, on_timeout, on_crash
+            )
+        if workers <= 1:
+            return {p: task(p, *args, self) for p in paths}
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Several PDFs per IPC round-trip on big folders, while still leaving
+        # ~4 chunks per worker so one slow scan doesn't stall the tail
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = ex.map(
+                task,
+                paths,
+                *(itertools.repeat(a) for a in args),
+                chunksize=chunksize,
+            )
+            return dict(zip(paths, results))
+
+    @staticmethod
+    def _map_pdfs_timeout(task, paths, workers, args, timeout, on_timeout, on_crash):
+        """_map_pdfs with a per-PDF deadline (see there).
+
+        Each worker is a multiprocessing.Process with its own Pipe and takes
+        one PDF at a time, so the parent knows when every PDF started and can
+        kill exactly the overdue worker; killing it only breaks its own pipe.
+        """
+        import multiprocessing
+        from multiprocessing.connection import wait
+
+        ctx = multiprocessing.get_context()
+
+        def spawn():
+            conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_timeout_worker, args=(child_conn, task, args), daemon=True
+            )
+            proc.start()
+            child_conn.close()
+            return proc, conn
+
+        results = {}
+        queue = list(reversed(paths))
+        idle = [spawn() for _ in range(workers)]
+        busy = {}  # conn -> (proc, path, deadline)
+        try:
+            while queue or busy:
+                while queue and idle:
+                    proc, conn = idle.pop()
+                    path = queue.pop()
+                    conn.send(path)
+                    busy[conn] = (proc, path, time.monotonic() + timeout)
+
+                next_deadline = min(d for _, _, d in busy.values())
+                for conn in wait(list(busy), max(0, next_deadline - time.monotonic())):
+                    proc, path, _ = busy.pop(conn)
+                    try:
+                        ok, value = conn.recv()
+                    except EOFError:
+                        proc.join()
+                        conn.close()
+                        print(
+                            f"[WARN] {os.path.basename(path)}: el proceso murio "
+                            f"(exitcode {proc.exitcode})"
+                        )
+                        results[path] = copy.copy(on_crash)
+                        if queue:
+                            idle.append(spawn())
+                        continue
+                    idle.append((proc, conn))
+                    if not ok:
+                        raise value  # same as map(): a task's error ends the batch
+                    results[path] = value
+
+                now = time.monotonic()
+                for conn, (proc, path, deadline) in list(busy.items()):
+                    if deadline <= now:
+                        del busy[conn]
+                        proc.kill()
+                        proc.join()
+                        conn.close()
+                        print(
+                            f"[WARN] {os.path.basename(path)}: timeout tras {timeout}s"
+                        )
+                        results[path] = copy.copy(on_timeout)
+                        if queue:
+                            idle.append(spawn())
+        finally:
+            for proc, conn in idle:
+                try:
+                    conn.send(None)  # sentinel: exit
+                except OSError:
+                    pass
+                conn.close()
+            for conn, (proc, _, _) in busy.items():
+                proc.kill()
+                conn.close()
+            for proc, _ in idle:
+                proc.join()
+            for proc, _, _ in busy.values():
+                proc.join()
+        return {p: results[p] for p in paths}
+
     # Reverse map: abbreviation -> full exam type name
     _ABBR_TO_EXAM_TYPE = {v: k for k, v in _EXAM_TYPE_ABBR.items()}
 
-    def _parse_exam_type_token(self, token):
-        """Resolve an exam type token (full name or abbreviation) to the full name."""
-        upper = token.upper().strip()
-        if upper in self._EXAM_TYPE_ABBR:
-            return upper  # already full name
-        if upper in self._ABBR_TO_EXAM_TYPE:
-            return self._ABBR_TO_EXAM_TYPE[upper]  # abbreviation -> full
-        return None
+    # Filename parsers (extract_from_filename)
+    # Uppercase token (full name or abbreviation) -> full exam type name
+    _EXAM_LOOKUP = {**{k: k for k in _EXAM_TYPE_ABBR}, **_ABBR_TO_EXAM_TYPE}
+    # (token, full exam type) for the generic scan: full names first, then
+    # abbreviations; the first token found in the name wins
+    _EXAM_SCAN_TOKENS = tuple(_EXAM_LOOKUP.items())
+    _RE_FN_GENERIC_DATE = re.compile(r"(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})")
+    _RE_FN_GENERIC_DNI = re.compile(r"(\d{8})", re.ASCII)
+    # Nombre de persona (después de DNI, antes de guion), tried in order
+    _RE_FN_GENERIC_NAME = [
+        re.compile(r"\d{8}\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s]{8,50}?)(?:\s*-)", re.IGNORECASE),
+        re.compile(
+            r"(?:DNI|dni|ID|id)[:\s]*\d+\s+([A-ZÁÉÍÓÚÑ\s]{10,50}?)"
+            r"(?:-|CONSORCIO|EMPRESA|COMPANY)",
+            re.IGNORECASE,
+        ),
+    ]
+
+    # Palabras que no aportan al nombre corto de la empresa
+    _FN_COMPANY_STOP_WORDS = frozenset({"MECANICA", "REVESTIMIENTO", "Y"})
+
+    @staticmethod
+    def _is_dni_token(tok):
+        r"""8 digits, same as \d{8}$ (isdecimal is exactly \d)."""
+        return len(tok) == 8 and tok.isdecimal()
+
+    @staticmethod
+    def _is_date_token(tok):
+        r"""DD.MM.YY / DD.MM.YYYY, same as \d{1,2}\.\d{1,2}\.\d{2,4}$."""
+        parts = tok.split(".")
+        if len(parts) != 3:
+            return False
+        dd, mm, yy = parts
+        return (
+            0 < len(dd) <= 2
+            and 0 < len(mm) <= 2
+            and 2 <= len(yy) <= 4
+            and (dd + mm + yy).isdecimal()
+        )
 
     def extract_from_filename(self, filename):
         """Extrae información del nombre del archivo como fallback.
@@ -1244,13 +1962,22 @@ class PDFProcessor:
         - Hudbay:   'DD.MM.YY TIPO DNI NOMBRE-EMPRESA.pdf'
         - Standard: 'DNI-NOMBRE-EMPRESA-TIPO-CMESPINAR-DD.MM.YY.pdf'
         - Unknown:  generic heuristic extraction
+
+        Results are cached per filename; each call returns a fresh dict.
         """
-        parts = {}
-        name_without_ext = filename.rsplit(".pdf", 1)[0].rsplit(".PDF", 1)[0].strip()
+        cached = _FILENAME_PARTS_CACHE.get(filename)
+        if cached is None:
+            cached = self._extract_from_filename_uncached(filename)
+            _FILENAME_PARTS_CACHE.put(filename, cached)
+        return dict(cached)
+
+    def _extract_from_filename_uncached(self, filename):
+        """Parseo real del nombre; ver extract_from_filename."""
+        name_without_ext = self._filename_stem(filename)
         if not name_without_ext:
-            return parts
+            return {}
 
-        fmt = self.detect_format(filename)
+        fmt = self._detect_format_name(name_without_ext)
 
         if fmt == "hudbay":
             return self._parse_hudbay_filename(name_without_ext)
@@ -1278,19 +2005,20 @@ class PDFProcessor:
 
         idx = 0
         # 1. Date (DD.MM.YY)
-        if idx < len(tokens) and re.match(r"\d{1,2}\.\d{1,2}\.\d{2,4}$", tokens[idx]):
+        if idx < len(tokens) and self._is_date_token(tokens[idx]):
             parts["date"] = tokens[idx]
             idx += 1
 
         # 2. Exam type (abbreviation or full)
         if idx < len(tokens):
-            exam = self._parse_exam_type_token(tokens[idx])
+            # split() tokens carry no whitespace; skip the strip()
+            exam = self._EXAM_LOOKUP.get(tokens[idx].upper())
             if exam:
                 parts["exam_type"] = exam
                 idx += 1
 
         # 3. DNI (8 digits)
-        if idx < len(tokens) and re.match(r"\d{8}$", tokens[idx]):
+        if idx < len(tokens) and self._is_dni_token(tokens[idx]):
             parts["dni"] = tokens[idx]
             idx += 1
 
@@ -1323,13 +2051,13 @@ class PDFProcessor:
         idx_end = len(segments) - 1
 
         # 1. First segment: DNI (8 digits)
-        if re.match(r"\d{8}$", segments[0].strip()):
+        if self._is_dni_token(segments[0].strip()):
             parts["dni"] = segments[0].strip()
             idx_start = 1
 
         # From the end: date, CMESPINAR, exam type
         # Last segment: date (DD.MM.YY)
-        if re.match(r"\d{1,2}\.\d{1,2}\.\d{2,4}$", segments[idx_end].strip()):
+        if self._is_date_token(segments[idx_end].strip()):
             parts["date"] = segments[idx_end].strip()
             idx_end -= 1
 
@@ -1339,7 +2067,7 @@ class PDFProcessor:
 
         # Exam type (abbreviation or full)
         if idx_end >= idx_start:
-            exam = self._parse_exam_type_token(segments[idx_end].strip())
+            exam = self._EXAM_LOOKUP.get(segments[idx_end].strip().upper())
             if exam:
                 parts["exam_type"] = exam
                 idx_end -= 1
@@ -1366,34 +2094,25 @@ class PDFProcessor:
         parts = {}
 
         # Extrae fecha (DD.MM.YY o DD-MM-YY)
-        date_match = re.search(r"(\d{1,2}[.\-/]\d{1,2}[.\-/]\d{2,4})", name_without_ext)
+        date_match = self._RE_FN_GENERIC_DATE.search(name_without_ext)
         if date_match:
             parts["date"] = date_match.group(1)
 
         # Extrae DNI (8 dígitos seguidos)
-        dni_match = re.search(r"(\d{8})", name_without_ext)
+        dni_match = self._RE_FN_GENERIC_DNI.search(name_without_ext)
         if dni_match:
             parts["dni"] = dni_match.group(1)
 
         # Busca tipo de examen (full names and abbreviations)
-        all_exam_tokens = list(self._EXAM_TYPE_ABBR.keys()) + list(
-            self._ABBR_TO_EXAM_TYPE.keys()
-        )
         upper_name = name_without_ext.upper()
-        for token in all_exam_tokens:
+        for token, exam in self._EXAM_SCAN_TOKENS:
             if token in upper_name:
-                exam = self._parse_exam_type_token(token)
-                if exam:
-                    parts["exam_type"] = exam
-                    break
+                parts["exam_type"] = exam
+                break
 
         # Extrae nombre de persona (después de DNI, antes de guion)
-        name_patterns = [
-            r"\d{8}\s+([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑ\s]{8,50}?)(?:\s*-)",
-            r"(?:DNI|dni|ID|id)[:\s]*\d+\s+([A-ZÁÉÍÓÚÑ\s]{10,50}?)(?:-|CONSORCIO|EMPRESA|COMPANY)",
-        ]
-        for pattern in name_patterns:
-            name_match = re.search(pattern, name_without_ext, re.IGNORECASE)
+        for pattern in self._RE_FN_GENERIC_NAME:
+            name_match = pattern.search(name_without_ext)
             if name_match:
                 person_name = name_match.group(1).strip()
                 if (
@@ -1406,13 +2125,13 @@ class PDFProcessor:
         # Extrae empresa (después del guion)
         if "-" in name_without_ext:
             company_part = name_without_ext.split("-", 1)[1]
-            company_clean = re.sub(r"[&]", "Y", company_part)
+            company_clean = company_part.replace("&", "Y")
             company_words = company_clean.split()
             if len(company_words) > 4:
                 important_words = [
                     w
                     for w in company_words[:6]
-                    if w.upper() not in ["MECANICA", "REVESTIMIENTO", "Y"]
+                    if w.upper() not in self._FN_COMPANY_STOP_WORDS
                 ]
                 company_words = (
                     important_words[:4] if important_words else company_words[:3]
@@ -1434,6 +2153,9 @@ class PDFProcessor:
     }
 
     MAX_PREVIEW_PAGES = 1  # Only load the single page used for extraction
+    # Preview images go to the browser as base64 JPEG data URLs; one quality
+    # for every preview path (single-page previews used to encode at 85)
+    _PREVIEW_JPEG_QUALITY = 75
 
     def generate_preview_single_page(
         self, pdf_path, defaults, page_num=0, max_width=900
@@ -1471,143 +2193,305 @@ class PDFProcessor:
         if fitz is None:
             return None
         try:
-            doc = fitz.open(pdf_path)
+            doc = self._open_pdf(pdf_path)
             total = len(doc)
             if page_num >= total:
                 doc.close()
                 return None
 
             page = doc[page_num]
+            # One text layer for the scanned-page check and every search_for
+            textpage = self._search_textpage(page)
             # Fall back to OCR if the page has no extractable text (scanned)
-            if len(page.get_text().strip()) < 50:
+            if len(page.get_text(textpage=textpage).strip()) < 50:
                 doc.close()
                 return None
 
-            page_rect = page.rect
-            zoom = max_width / page_rect.width
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-
-            pil_img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-            buf = io.BytesIO()
-            pil_img.save(buf, format="JPEG", quality=85)
-            img_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-
-            highlights = self._find_highlights_digital(page, defaults, zoom)
+            rendered = self._render_digital_page(
+                page, max_width, self._preview_cache_key(pdf_path)
+            )
+            highlights = self._find_highlights_digital(
+                page, defaults, rendered["zoom"], textpage
+            )
             capped_total = min(total, self.MAX_PREVIEW_PAGES)
             doc.close()
 
             return {
-                "page": {
-                    "image": f"data:image/jpeg;base64,{img_b64}",
-                    "width": pix.width,
-                    "height": pix.height,
-                    "highlights": highlights,
-                    "page": page_num + 1,
-                },
+                "page": self._preview_page_dict(rendered, highlights, page_num),
                 "total_pages": capped_total,
             }
         except Exception:
             return None
 
+    @staticmethod
+    def _preview_cache_key(source):
+        """Content digest for _PREVIEW_PAGE_CACHE, or None if it can't be read."""
+        try:
+            return _pdf_digest(source)
+        except (OSError, TypeError):
+            return None
+
+    @staticmethod
+    def _jpeg_data_url(img_bytes):
+        """data: URL for JPEG bytes, decoded to str once (no f-string copy)."""
+        encoded = base64.b64encode(img_bytes)
+        return (b"data:image/jpeg;base64," + encoded).decode("ascii")
+
+    @staticmethod
+    def _preview_page_dict(rendered, highlights, page_num):
+        """Page entry of a preview response from a cached render."""
+        return {
+            "image": rendered["image"],
+            "width": rendered["width"],
+            "height": rendered["height"],
+            "highlights": highlights,
+            "page": page_num + 1,
+        }
+
+    def _render_digital_page(self, page, max_width, pdf_key=None):
+        """Render a PyMuPDF page as a JPEG data URL max_width pixels wide.
+
+        Returns dict(image, width, height, zoom). Shared by both digital
+        previews and cached per (pdf_key, page, max_width), so paging back and
+        forth in the UI doesn't re-render. Callers must not mutate it.
+        """
+        key = (pdf_key, page.number, max_width, "digital") if pdf_key else None
+        rendered = _PREVIEW_PAGE_CACHE.get(key) if key else None
+        if rendered is not None:
+            return rendered
+
+        zoom = max_width / page.rect.width
+        mat = fitz.Matrix(zoom, zoom)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        # JPEG straight from the pixmap buffer (no PIL copy / BytesIO)
+        img_bytes = pix.tobytes("jpeg", jpg_quality=self._PREVIEW_JPEG_QUALITY)
+        rendered = {
+            "image": self._jpeg_data_url(img_bytes),
+            "width": pix.width,
+            "height": pix.height,
+            "zoom": zoom,
+        }
+        if key:
+            _PREVIEW_PAGE_CACHE.put(key, rendered)
+        return rendered
+
+    def _render_ocr_page(self, pdf_path, page_num, max_width, with_ocr, pdf_key=None):
+        """Rasterize a page for an OCR preview, with its tesseract word boxes.
+
+        Returns dict(image, width, height, ocr_data, scale_x, scale_y), where
+        the scales map OCR coordinates onto the JPEG, or None if the page
+        can't be rendered. ocr_data is only filled when with_ocr is set.
+        Cached like _render_digital_page; callers must not mutate it.
+        """
+        key = (pdf_key, page_num, max_width, "ocr") if pdf_key else None
+        rendered = _PREVIEW_PAGE_CACHE.get(key) if key else None
+        if rendered is not None and (rendered["ocr_data"] is not None or not with_ocr):
+            return rendered
+
+        images = self._render_pages(pdf_path, page_num + 1, page_num + 1)
+        if not images:
+            return None
+
+        orig_img = img = images[0]
+        orig_w, orig_h = img.size
+        if orig_w > max_width:
+            # resize() returns a new image; BILINEAR is plenty for a thumbnail
+            scale = max_width / orig_w
+            new_h = int(orig_h * scale)
+            img = orig_img.resize((max_width, new_h), Image.BILINEAR)
+        img_width, img_height = img.size
+
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=self._PREVIEW_JPEG_QUALITY)
+        rendered = {
+            "image": self._jpeg_data_url(buf.getbuffer()),
+            "width": img_width,
+            "height": img_height,
+            "ocr_data": None,
+            "scale_x": img_width / orig_w,
+            "scale_y": img_height / orig_h,
+        }
+
+        # Word boxes only matter if some field will be highlighted
+        if with_ocr:
+            ocr_img = self._ocr_preview_image(orig_img, max_width)
+            rendered["ocr_data"] = self._ocr_page_data(
+                ocr_img, self._OCR_PREVIEW_CONFIG
+            )
+            rendered["scale_x"] = img_width / ocr_img.width
+            rendered["scale_y"] = img_height / ocr_img.height
+
+        if key:
+            _PREVIEW_PAGE_CACHE.put(key, rendered)
+        return rendered
+
+    def _render_pages(
+        self, pdf_path, first_page, last_page, dpi=200, grayscale=False, thread_count=1
+    ):
+        """Rasterize pages first_page..last_page (1-based) to PIL images.
+
+        PyMuPDF renders in-process; pdf2image (a pdftoppm subprocess plus temp
+        files, thread_count of them) is only used when PyMuPDF is not
+        installed. Images are RGB, or 8-bit gray ("L") with grayscale.
+        """
+        if fitz is None or Image is None:
+            return self._convert_pdf_pages(
+                pdf_path,
+                first_page=first_page,
+                last_page=last_page,
+                dpi=dpi,
+                grayscale=grayscale,
+                thread_count=thread_count,
+                poppler_path=self._poppler_path,
+            )
+        colorspace, mode = (fitz.csGRAY, "L") if grayscale else (fitz.csRGB, "RGB")
+        with self._open_pdf(pdf_path) as doc:
+            images = []
+            for n in range(first_page - 1, min(last_page, len(doc))):
+                pix = doc[n].get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+                images.append(
+                    Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+                )
+        # MuPDF keeps decoded scan images in its global store (up to 256 MB
+        # per process); the pixels are already copied into PIL, so free them
+        fitz.TOOLS.store_shrink(100)
+        return images
+
+    # Preview OCR only needs word boxes good enough to draw highlights:
+    # uniform-block segmentation, no inverted-text pass, and at most
+    # max(_OCR_PREVIEW_MIN_WIDTH, 2 * preview width) pixels across
+    _OCR_PREVIEW_CONFIG = "--psm 6 -c tessedit_do_invert=0"
+    _OCR_PREVIEW_MIN_WIDTH = 1200
+
+    @classmethod
+    def _ocr_preview_image(cls, img, max_width):
+        """Downscale a rendered page for preview OCR (work grows with pixels)."""
+        target_w = max(cls._OCR_PREVIEW_MIN_WIDTH, max_width * 2)
+        if img.width <= target_w:
+            return img
+        target_h = max(1, round(img.height * target_w / img.width))
+        return img.resize((target_w, target_h), Image.BILINEAR)
+
+    @staticmethod
+    def _ocr_page_data(img, config=None):
+        """pytesseract.image_to_data (DICT) for a preview page, cached by pixels.
+
+        Paging back and forth in the preview re-renders the same page; the
+        pixel hash lets it skip the OCR pass. Callers must not mutate the dict.
+        """
+        key = (
+            hashlib.blake2b(img.tobytes(), digest_size=16).digest(),
+            img.size,
+            config,
+        )
+        data = _OCR_DATA_CACHE.get(key)
+        if data is None:
+            kwargs = {"config": config} if config else {}
+            data = pytesseract.image_to_data(
+                img,
+                lang=_resolve_ocr_lang(),
+                output_type=pytesseract.Output.DICT,
+                **kwargs,
+            )
+            _OCR_DATA_CACHE.put(key, data)
+        return data
+
+    @staticmethod
+    def _can_ocr():
+        """pytesseract plus a way to rasterize pages (PyMuPDF or pdf2image)."""
+        return pytesseract is not None and (
+            (fitz is not None and Image is not None) or convert_from_path is not None
+        )
+
+    @classmethod
+    def _can_preview_ocr(cls):
+        return Image is not None and cls._can_ocr()
+
     def _preview_ocr_single(self, pdf_path, defaults, page_num, max_width):
-        """Render a single page using pdf2image + pytesseract."""
-        if convert_from_path is None or pytesseract is None or Image is None:
+        """Render a single page (PyMuPDF, or pdf2image) and OCR it with pytesseract."""
+        if not self._can_preview_ocr():
             return None
         try:
-            images = convert_from_path(
+            rendered = self._render_ocr_page(
                 pdf_path,
-                first_page=page_num + 1,
-                last_page=page_num + 1,
-                dpi=200,
-                poppler_path=_POPPLER_PATH,
+                page_num,
+                max_width,
+                bool(self._highlight_fields(defaults)),
+                self._preview_cache_key(pdf_path),
             )
-            if not images:
+            if rendered is None:
                 return None
 
             # Get total page count
             if fitz is not None:
-                doc = fitz.open(pdf_path)
+                doc = self._open_pdf(pdf_path)
                 total = min(len(doc), self.MAX_PREVIEW_PAGES)
                 doc.close()
             else:
                 total = page_num + 1  # can't know total without fitz
 
-            orig_img = images[0]
-            img = orig_img.copy()
-            orig_w, orig_h = img.size
-            if orig_w > max_width:
-                scale = max_width / orig_w
-                new_h = int(orig_h * scale)
-                img = img.resize((max_width, new_h), Image.LANCZOS)
-            img_width, img_height = img.size
-            scale_x = img_width / orig_w
-            scale_y = img_height / orig_h
-
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=85)
-            img_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-
-            # OCR language detection
-            ocr_lang = "spa+eng"
-            try:
-                available = pytesseract.get_languages()
-                if "spa" not in available:
-                    ocr_lang = "eng"
-            except Exception:
-                pass
-
-            ocr_data = pytesseract.image_to_data(
-                orig_img,
-                lang=ocr_lang,
-                output_type=pytesseract.Output.DICT,
-                config="--psm 6",
+            highlights = self._find_highlights_ocr(
+                rendered["ocr_data"] or {},
+                defaults,
+                rendered["scale_x"],
+                rendered["scale_y"],
             )
-            highlights = self._find_highlights_ocr(ocr_data, defaults, scale_x, scale_y)
 
             return {
-                "page": {
-                    "image": f"data:image/jpeg;base64,{img_b64}",
-                    "width": img_width,
-                    "height": img_height,
-                    "highlights": highlights,
-                    "page": page_num + 1,
-                },
+                "page": self._preview_page_dict(rendered, highlights, page_num),
                 "total_pages": total,
             }
         except Exception:
             return None
 
-    def _find_highlights_digital(self, page, defaults, zoom):
+    @classmethod
+    def _highlight_fields(cls, defaults):
+        """(field, value) pairs that get a highlight, in defaults order."""
+        return [(f, v) for f, v in defaults.items() if v and f in cls._FIELD_COLORS]
+
+    @classmethod
+    def _highlight_box(cls, field, x0, y0, x1, y1, sx, sy):
+        """Highlight dict for a source-space box scaled by (sx, sy)."""
+        return {
+            "field": field,
+            "color": cls._FIELD_COLORS[field],
+            "x": x0 * sx,
+            "y": y0 * sy,
+            "w": (x1 - x0) * sx,
+            "h": (y1 - y0) * sy,
+        }
+
+    @staticmethod
+    def _search_textpage(page):
+        """TextPage built with search_for's default flags, reusable across searches."""
+        return page.get_textpage(
+            flags=fitz.TEXT_DEHYPHENATE
+            | fitz.TEXT_PRESERVE_WHITESPACE
+            | fitz.TEXT_PRESERVE_LIGATURES
+            | fitz.TEXT_MEDIABOX_CLIP
+        )
+
+    def _find_highlights_digital(self, page, defaults, zoom, textpage=None):
         """Find bounding boxes for field values in a digital PDF page."""
         highlights = []
-        for field, value in defaults.items():
-            if not value or field not in self._FIELD_COLORS:
-                continue
+        fields = self._highlight_fields(defaults)
+        if fields and textpage is None:
+            textpage = self._search_textpage(page)
+        for field, value in fields:
             val_str = str(value)
-            rects = page.search_for(val_str)
+            rects = page.search_for(val_str, textpage=textpage)
             if not rects:
                 normalized = self._normalize_for_search(val_str)
                 if normalized != val_str:
-                    rects = page.search_for(normalized)
+                    rects = page.search_for(normalized, textpage=textpage)
             # Fallback: search for first word only
             if not rects and " " in val_str:
                 first_word = val_str.split()[0]
-                rects = page.search_for(first_word)
+                rects = page.search_for(first_word, textpage=textpage)
             for rect in rects:
-                w = (rect.x1 - rect.x0) * zoom
-                h = (rect.y1 - rect.y0) * zoom
-                if w > 1 and h > 1:  # Skip degenerate rectangles
-                    highlights.append(
-                        {
-                            "field": field,
-                            "color": self._FIELD_COLORS[field],
-                            "x": rect.x0 * zoom,
-                            "y": rect.y0 * zoom,
-                            "w": w,
-                            "h": h,
-                        }
-                    )
+                hl = self._highlight_box(field, *rect, zoom, zoom)
+                if hl["w"] > 1 and hl["h"] > 1:  # Skip degenerate rectangles
+                    highlights.append(hl)
         return highlights
 
     def _find_highlights_ocr(self, ocr_data, defaults, scale_x, scale_y):
@@ -1624,19 +2508,31 @@ class PDFProcessor:
         heights = ocr_data.get("height", [])
 
         # Compact index: only non-empty word positions
-        word_idx = [i for i in range(len(words)) if (words[i] or "").strip()]
+        word_idx, upper_tape, norm_tape = self._ocr_tapes(words)
+        norms = norm_tape.parts
         nw = len(word_idx)
-
-        def _box(seq):
-            x0 = min(lefts[q] for q in seq)
-            y0 = min(tops[q] for q in seq)
-            x1 = max(lefts[q] + widths[q] for q in seq)
-            y1 = max(tops[q] + heights[q] for q in seq)
+        # Positions of each normalized word, so exact-sequence matching only
+        # tries starts whose first word already matches (a DNI is one probe)
+        positions = {}
+        for c, nm in enumerate(norms):
+            positions.setdefault(nm, []).append(c)
+
+        # Word edges in compact order: every candidate box is a run of
+        # consecutive non-empty words, so min/max run over plain slices
+        c_lefts = [lefts[q] for q in word_idx]
+        c_tops = [tops[q] for q in word_idx]
+        c_rights = [lefts[q] + widths[q] for q in word_idx]
+        c_bottoms = [tops[q] + heights[q] for q in word_idx]
+
+        def _box(a, b):
+            """Box around compact words a..b-1."""
+            x0 = min(c_lefts[a:b])
+            y0 = min(c_tops[a:b])
+            x1 = max(c_rights[a:b])
+            y1 = max(c_bottoms[a:b])
             return (x0, y0, x1, y1) if (x1 - x0) > 2 and (y1 - y0) > 2 else None
 
-        for field, value in defaults.items():
-            if not value or field not in self._FIELD_COLORS:
-                continue
+        for field, value in self._highlight_fields(defaults):
             value_str = str(value).strip().upper()
             value_wds = value_str.split()
             if not value_wds:
@@ -1647,30 +2543,42 @@ class PDFProcessor:
             found_box = None
 
             # Strategy 1: exact consecutive word-sequence match (tight box)
-            for start in range(nw - vw + 1):
-                seq = word_idx[start : start + vw]
-                if all(
-                    self._normalize_for_search((words[seq[k]] or "").strip().upper())
-                    == value_norms[k]
-                    for k in range(vw)
-                ):
-                    found_box = _box(seq)
+            for start in positions.get(value_norms[0], ()):
+                if start + vw > nw:
+                    break
+                if norms[start : start + vw] == value_norms:
+                    found_box = _box(start, start + vw)
                     break
 
             # Strategy 2: value as substring of a word window — trim to value words
             if not found_box:
                 val_norm = self._normalize_for_search(value_str)
-                for start in range(nw):
-                    concat = ""
+                # A window can only match if it starts at or before the word
+                # where the value last occurs on the page. The last matching
+                # window is the one that counts, so scan backwards from there.
+                last = max(
+                    (
+                        w
+                        for w in (
+                            upper_tape.last_start_word(value_str),
+                            norm_tape.last_start_word(val_norm),
+                        )
+                        if w is not None
+                    ),
+                    default=-1,
+                )
+                matched = False
+                for start in range(last, -1, -1):
+                    cu = cn = ""
                     seq = []
                     for k in range(start, min(start + vw + 8, nw)):
-                        wk = (words[word_idx[k]] or "").strip()
-                        if not wk:
-                            continue
-                        concat = (concat + " " + wk).strip() if concat else wk
+                        # Grow the window one word at a time: upper() and the
+                        # accent strip are per-character, so the joined words
+                        # equal the old re-normalized window
+                        wu = upper_tape.parts[k]
+                        cu = f"{cu} {wu}" if seq else wu
+                        cn = f"{cn} {norms[k]}" if seq else norms[k]
                         seq.append(word_idx[k])
-                        cu = concat.upper()
-                        cn = self._normalize_for_search(cu)
                         if value_str in cu or val_norm in cn:
                             # Find where in concat the value starts
                             pos = cu.find(value_str)
@@ -1690,42 +2598,44 @@ class PDFProcessor:
                                 if chars >= len(value_str):
                                     trim_end = trim_start + t + 1
                                     break
-                            trimmed = seq[trim_start:trim_end]
-                            if trimmed:
-                                found_box = _box(trimmed)
+                            if trim_start < trim_end:
+                                found_box = _box(start + trim_start, start + trim_end)
+                            matched = True
                             break
+                    if matched:
+                        break
 
             # Strategy 3: first word only (last resort for multi-word values)
             if not found_box and vw >= 2:
-                fw_norm = value_norms[0]
-                for wi in word_idx:
-                    if (
-                        self._normalize_for_search((words[wi] or "").strip().upper())
-                        == fw_norm
-                    ):
-                        found_box = _box([wi])
-                        break
+                fw_starts = positions.get(value_norms[0])
+                if fw_starts:
+                    found_box = _box(fw_starts[0], fw_starts[0] + 1)
 
             if found_box:
-                x0, y0, x1, y1 = found_box
                 highlights.append(
-                    {
-                        "field": field,
-                        "color": self._FIELD_COLORS[field],
-                        "x": x0 * scale_x,
-                        "y": y0 * scale_y,
-                        "w": (x1 - x0) * scale_x,
-                        "h": (y1 - y0) * scale_y,
-                    }
+                    self._highlight_box(field, *found_box, scale_x, scale_y)
                 )
 
         return highlights
 
+    def _ocr_tapes(self, words):
+        """Indices of the non-empty OCR words plus their upper/normalized tapes."""
+        word_idx, uppers = [], []
+        for i, w in enumerate(words):
+            w = (w or "").strip()
+            if w:
+                word_idx.append(i)
+                uppers.append(w.upper())
+        norms = [self._normalize_for_search(u) for u in uppers]
+        return word_idx, _WordTape(uppers), _WordTape(norms)
+
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def _normalize_for_search(value):
-        """Normalize a string for fuzzy matching: strip accents for comparison."""
-        import unicodedata
+        """Normalize a string for fuzzy matching: strip accents for comparison.
 
+        Cached: the OCR highlight loops normalize the same words over and over.
+        """
         nfkd = unicodedata.normalize("NFKD", str(value))
         return "".join(c for c in nfkd if not unicodedata.combining(c))
 
@@ -1734,7 +2644,7 @@ class PDFProcessor:
         if fitz is None:
             return None
         try:
-            doc = fitz.open(pdf_path)
+            doc = self._open_pdf(pdf_path)
             total = len(doc)
             if total == 0:
                 doc.close()
@@ -1747,53 +2657,30 @@ class PDFProcessor:
                 return None
 
             pages = []
+            fields = self._highlight_fields(defaults)
+            pdf_key = self._preview_cache_key(pdf_path)
             render_count = min(total, self.MAX_PREVIEW_PAGES)
             for page_num in range(render_count):
                 page = doc[page_num]
-                page_rect = page.rect
-                zoom = max_width / page_rect.width
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                # Convert to JPEG for smaller payload
-                pil_img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-                buf = io.BytesIO()
-                pil_img.save(buf, format="JPEG", quality=75)
-                img_bytes = buf.getvalue()
-                img_b64 = base64.b64encode(img_bytes).decode("ascii")
+                rendered = self._render_digital_page(page, max_width, pdf_key)
+                zoom = rendered["zoom"]
 
                 # Find bounding boxes for each field value
                 highlights = []
-                for field, value in defaults.items():
-                    if not value or field not in self._FIELD_COLORS:
-                        continue
+                textpage = self._search_textpage(page) if fields else None
+                for field, value in fields:
                     val_str = str(value)
                     # Try exact search first, then without accents (ñ -> n fallback)
-                    rects = page.search_for(val_str)
+                    rects = page.search_for(val_str, textpage=textpage)
                     if not rects:
                         normalized = self._normalize_for_search(val_str)
                         if normalized != val_str:
-                            rects = page.search_for(normalized)
-                    for rect in rects:
-                        highlights.append(
-                            {
-                                "field": field,
-                                "color": self._FIELD_COLORS[field],
-                                "x": rect.x0 * zoom,
-                                "y": rect.y0 * zoom,
-                                "w": (rect.x1 - rect.x0) * zoom,
-                                "h": (rect.y1 - rect.y0) * zoom,
-                            }
-                        )
+                            rects = page.search_for(normalized, textpage=textpage)
+                    highlights.extend(
+                        self._highlight_box(field, *rect, zoom, zoom) for rect in rects
+                    )
 
-                pages.append(
-                    {
-                        "image": f"data:image/jpeg;base64,{img_b64}",
-                        "width": pix.width,
-                        "height": pix.height,
-                        "highlights": highlights,
-                        "page": page_num + 1,
-                    }
-                )
+                pages.append(self._preview_page_dict(rendered, highlights, page_num))
 
             doc.close()
             return {"pages": pages, "total_pages": total}
@@ -1801,110 +2688,109 @@ class PDFProcessor:
             return None
 
     def _preview_ocr_pdf(self, pdf_path, defaults, max_width):
-        """Use pdf2image + pytesseract for scanned PDFs."""
-        if convert_from_path is None or pytesseract is None or Image is None:
+        """Render pages (PyMuPDF, or pdf2image) and OCR them with pytesseract."""
+        if not self._can_preview_ocr():
             return None
         try:
-            images = convert_from_path(
-                pdf_path,
-                first_page=1,
-                last_page=self.MAX_PREVIEW_PAGES,
-                poppler_path=_POPPLER_PATH,
-            )
-            if not images:
-                return None
-
-            # Detect OCR language
-            ocr_lang = "spa+eng"
-            try:
-                available = pytesseract.get_languages()
-                if "spa" not in available:
-                    ocr_lang = "eng"
-            except Exception:
-                pass
-
+            fields = self._highlight_fields(defaults)
+            # (field, upper value, accent-stripped value), same for every page
+            queries = []
+            for field, value in fields:
+                value_str = str(value).upper()
+                queries.append(
+                    (field, value_str, self._normalize_for_search(value_str))
+                )
+            pdf_key = self._preview_cache_key(pdf_path)
             pages = []
-            for page_num, orig_img in enumerate(images):
-                img = orig_img.copy()
-                orig_w, orig_h = img.size
-                if orig_w > max_width:
-                    scale = max_width / orig_w
-                    new_h = int(orig_h * scale)
-                    img = img.resize((max_width, new_h), Image.LANCZOS)
-                img_width, img_height = img.size
-                scale_x = img_width / orig_w
-                scale_y = img_height / orig_h
-
-                buf = io.BytesIO()
-                img.save(buf, format="JPEG", quality=75)
-                img_bytes = buf.getvalue()
-                img_b64 = base64.b64encode(img_bytes).decode("ascii")
-
-                # OCR with bounding box data on original-size image
-                ocr_data = pytesseract.image_to_data(
-                    orig_img,
-                    lang=ocr_lang,
-                    output_type=pytesseract.Output.DICT,
+            for page_num in range(self.MAX_PREVIEW_PAGES):
+                # OCR with bounding box data (skipped when there is nothing
+                # to highlight)
+                rendered = self._render_ocr_page(
+                    pdf_path, page_num, max_width, bool(fields), pdf_key
                 )
+                if rendered is None:
+                    break
+                ocr_data = rendered["ocr_data"] or {}
+                scale_x = rendered["scale_x"]
+                scale_y = rendered["scale_y"]
 
                 highlights = []
-                for field, value in defaults.items():
-                    if not value or field not in self._FIELD_COLORS:
+                words = ocr_data.get("text", [])
+                n = len(words)
+                word_idx, upper_tape, norm_tape = self._ocr_tapes(words)
+                # Bottom edges of non-empty words (blank ones never win max)
+                # and each word's position on the tapes (-1 when blank)
+                bottoms = [-math.inf] * n
+                tape_pos = [-1] * n
+                for c, k in enumerate(word_idx):
+                    bottoms[k] = ocr_data["top"][k] + ocr_data["height"][k]
+                    tape_pos[k] = c
+                for field, value_str, value_norm in queries:
+                    # One find() per tape; windows (10 words) ending before the
+                    # first occurrence cannot match, so start the scan there
+                    ends = [
+                        e
+                        for e in (
+                            upper_tape.first_end_word(value_str),
+                            norm_tape.first_end_word(value_norm),
+                        )
+                        if e is not None
+                    ]
+                    if not ends:
                         continue
-                    value_str = str(value).upper()
-                    value_norm = self._normalize_for_search(value_str)
-                    words = ocr_data.get("text", [])
-                    n = len(words)
+                    end = min(ends)
+                    first_i = max(0, word_idx[end] - 9) if end >= 0 else 0
                     found = False
-                    for i in range(n):
-                        if found:
-                            break
+                    for i in range(first_i, n):
                         if not words[i]:
                             continue
-                        concat = ""
+                        concat_upper = concat_norm = ""
                         for j in range(i, min(i + 10, n)):
-                            w = (words[j] or "").strip()
-                            if not w:
+                            c = tape_pos[j]
+                            if c < 0:
                                 continue
-                            concat = (concat + " " + w).strip() if concat else w
-                            concat_upper = concat.upper()
-                            concat_norm = self._normalize_for_search(concat_upper)
+                            wu = upper_tape.parts[c]
+                            wn = norm_tape.parts[c]
+                            if concat_upper:
+                                concat_upper = f"{concat_upper} {wu}"
+                                concat_norm = f"{concat_norm} {wn}"
+                            else:
+                                concat_upper, concat_norm = wu, wn
                             if value_str in concat_upper or value_norm in concat_norm:
                                 x0 = ocr_data["left"][i]
                                 y0 = ocr_data["top"][i]
                                 x1 = ocr_data["left"][j] + ocr_data["width"][j]
-                                y1 = max(
-                                    ocr_data["top"][k] + ocr_data["height"][k]
-                                    for k in range(i, j + 1)
-                                    if (words[k] or "").strip()
-                                )
+                                y1 = max(bottoms[i : j + 1])
                                 highlights.append(
-                                    {
-                                        "field": field,
-                                        "color": self._FIELD_COLORS[field],
-                                        "x": x0 * scale_x,
-                                        "y": y0 * scale_y,
-                                        "w": (x1 - x0) * scale_x,
-                                        "h": (y1 - y0) * scale_y,
-                                    }
+                                    self._highlight_box(
+                                        field, x0, y0, x1, y1, scale_x, scale_y
+                                    )
                                 )
                                 found = True
                                 break
+                        if found:
+                            break
 
-                pages.append(
-                    {
-                        "image": f"data:image/jpeg;base64,{img_b64}",
-                        "width": img_width,
-                        "height": img_height,
-                        "highlights": highlights,
-                        "page": page_num + 1,
-                    }
-                )
+                pages.append(self._preview_page_dict(rendered, highlights, page_num))
 
-            return {"pages": pages, "total_pages": len(images)}
+            if not pages:
+                return None
+            return {"pages": pages, "total_pages": len(pages)}
         except Exception:
             return None
 
+    # Caracteres no válidos en nombres de archivo; "&" is also dropped from the
+    # name/company parts
+    _FILENAME_STRIP = str.maketrans("", "", '<>:"/\\|?*&')
+    _FINAL_STRIP = str.maketrans("", "", '<>:"/\\|?*')
+
+    @classmethod
+    def _finalize_filename(cls, new_name):
+        """Drop invalid chars, collapse whitespace/underscore runs into one "_"
+        and trim "_" at the ends."""
+        joined = "_".join(new_name.translate(cls._FINAL_STRIP).split())
+        return "_".join(part for part in joined.split("_") if part)
+
     def generate_filename_parts(self, pdf_path, verbose=False, original_filename=None):
         """Extrae información y genera partes del nombre de archivo"""
         # Extrae texto del PDF
@@ -1920,61 +2806,15 @@ class PDFProcessor:
         # Si no hay texto del PDF, usa solo el nombre del archivo
         if not text or len(text.strip()) < 10:
             if filename_data:
-                # Construye nombre desde el nombre del archivo
-                parts = []
-                metadata = {}
-
-                # Orden específico: DNI, NOMBRE, EMPRESA, TIPO_EXAMEN,
-                # CMESPINAR, FECHA
-
-                # 1. DNI (requerido)
-                if filename_data.get("dni"):
-                    parts.append(filename_data["dni"])
-                    metadata["dni"] = filename_data["dni"]
-                else:
-                    # Sin DNI no podemos generar nombre
-                    if verbose:
-                        print("  [WARN] DNI no encontrado en nombre del archivo")
-                    return None, None
-
-                # 2. NOMBRE
-                if filename_data.get("person_name"):
-                    name_clean = "_".join(filename_data["person_name"].split()[:4])
-                    name_clean = re.sub(r'[<>:"/\\|?*&]', "", name_clean)
-                    parts.append(name_clean)
-                    metadata["nombre"] = filename_data["person_name"]
-
-                # 3. EMPRESA
-                if filename_data.get("company"):
-                    company_clean = "_".join(filename_data["company"].split()[:4])
-                    company_clean = re.sub(r'[<>:"/\\|?*&]', "", company_clean)
-                    parts.append(company_clean)
-                    metadata["empresa"] = filename_data["company"]
-
-                # 4. TIPO DE EXAMEN
-                if filename_data.get("exam_type"):
-                    parts.append(filename_data["exam_type"])
-                    metadata["tipo_examen"] = filename_data["exam_type"]
-
-                # 5. CMESPINAR (constante)
-                parts.append("CMESPINAR")
-                metadata["centro"] = "CMESPINAR"
-
-                # 6. FECHA DE EVALUACION
-                if filename_data.get("date"):
-                    date_clean = (
-                        filename_data["date"].replace(".", "-").replace("/", "-")
-                    )
-                    parts.append(date_clean)
-                    metadata["fecha"] = filename_data["date"]
-
-                if parts:
-                    new_name = "_".join(parts)
-                    new_name = re.sub(r'[<>:"/\\|?*]', "", new_name)
-                    new_name = re.sub(r"\s+", "_", new_name)
-                    new_name = re.sub(r"_+", "_", new_name)
-                    new_name = new_name.strip("_")
-                    return new_name + ".pdf", metadata
+                date = filename_data.get("date")
+                return self._build_filename(
+                    filename_data.get("dni"),
+                    filename_data.get("person_name"),
+                    filename_data.get("company"),
+                    filename_data.get("exam_type"),
+                    (date, date.translate(_DATE_SEP_TRANS)) if date else None,
+                    verbose=verbose,
+                )
 
             # Si tampoco hay datos del nombre, retorna None
             if verbose:
@@ -1985,7 +2825,6 @@ class PDFProcessor:
         date = self.extract_dates(text)
         number = self.extract_numbers(text)
         entity = self.extract_entity_names(text)
-        doc_type = self.detect_document_type(text)
         exam_type = self.extract_exam_type(text)
 
         # Si no se encontró información en el texto, usa datos del nombre del archivo
@@ -1994,8 +2833,6 @@ class PDFProcessor:
             date = filename_data["date"]
         if not number and filename_data.get("dni"):
             number = filename_data["dni"]
-        if not doc_type and filename_data.get("doc_type"):
-            doc_type = filename_data["doc_type"]
         if not exam_type and filename_data.get("exam_type"):
             exam_type = filename_data["exam_type"]
         if not entity:
@@ -2004,41 +2841,7 @@ class PDFProcessor:
             elif filename_data.get("company"):
                 entity = filename_data["company"]
 
-        # Construye las partes en el orden específico requerido:
-        # 1. DNI
-        # 2. NOMBRE
-        # 3. EMPRESA
-        # 4. TIPO DE EXAMEN
-        # 5. CMESPINAR (constante)
-        # 6. FECHA DE EVALUACION
-        parts = []
-        metadata = {}
-
-        # 1. DNI
-        dni_value = None
-        if number:
-            # Si es DNI (8 dígitos) o contiene DNI en el texto
-            if "DNI" in text.upper() or (number and len(number) == 8):
-                dni_value = number
-            elif number:
-                dni_value = number
-
-        # También verifica en filename_data
-        if not dni_value and filename_data.get("dni"):
-            dni_value = filename_data["dni"]
-
-        if dni_value:
-            parts.append(dni_value)
-            metadata["dni"] = dni_value
-            if verbose:
-                print(f"  🔢 DNI: {dni_value}")
-        else:
-            # Si no hay DNI, no podemos generar el nombre
-            if verbose:
-                print("  [WARN] DNI no encontrado - requerido para generar nombre")
-            return None, None
-
-        # 2. NOMBRE (persona)
+        # NOMBRE (persona)
         person_name = None
         if entity:
             # Verifica si es un nombre de persona (típicamente 3-4 palabras en mayúsculas)
@@ -2054,20 +2857,7 @@ class PDFProcessor:
         if not person_name and filename_data.get("person_name"):
             person_name = filename_data["person_name"]
 
-        if person_name:
-            # Limpia y normaliza el nombre
-            name_clean = "_".join(person_name.split()[:4])  # Máximo 4 palabras
-            name_clean = re.sub(r'[<>:"/\\|?*&]', "", name_clean)
-            parts.append(name_clean)
-            metadata["nombre"] = person_name
-            if verbose:
-                print(f"  👤 Nombre: {person_name}")
-        else:
-            # Nombre es opcional pero recomendado
-            if verbose:
-                print("  [WARN] Nombre no encontrado")
-
-        # 3. EMPRESA
+        # EMPRESA
         company_name = None
         if filename_data.get("company"):
             company_name = filename_data["company"]
@@ -2075,76 +2865,129 @@ class PDFProcessor:
             # Si entity no es nombre de persona, podría ser empresa
             company_name = entity
 
-        if company_name:
-            # Limpia y normaliza la empresa
-            company_clean = "_".join(company_name.split()[:4])  # Máximo 4 palabras
-            company_clean = re.sub(r'[<>:"/\\|?*&]', "", company_clean)
-            parts.append(company_clean)
-            metadata["empresa"] = company_name
+        # FECHA: convierte 31.12.25 a 31-12-25, o 31/12/2025 a 31-12-2025
+        fecha = None
+        if date:
+            date_clean = self._RE_NORM_DATE_STRIP.sub("", date)
+            # Si tiene formato DD.MM.YY, convierte a DD-MM-YY
+            if "." in date_clean:
+                date_clean = date_clean.replace(".", "-")
+            else:
+                date_clean = date_clean.replace("/", "-")
+            fecha = (date, date_clean)
+
+        # El número extraído se usa como DNI (con o sin etiqueta "DNI")
+        return self._build_filename(
+            number or None, person_name, company_name, exam_type, fecha, verbose
+        )
+
+    def _build_filename(
+        self,
+        dni,
+        nombre=None,
+        empresa=None,
+        tipo_examen=None,
+        fecha=None,
+        verbose=False,
+    ):
+        """Arma (nombre.pdf, metadata) con las partes en el orden requerido.
+
+        DNI (requerido), NOMBRE, EMPRESA, TIPO DE EXAMEN, CMESPINAR (constante)
+        y FECHA DE EVALUACION. fecha is (raw date, date for the filename).
+        Returns (None, None) without a DNI.
+        """
+        if not dni:
+            # Si no hay DNI, no podemos generar el nombre
             if verbose:
-                print(f"  🏢 Empresa: {company_name}")
-        else:
-            # Empresa es opcional
+                print("  [WARN] DNI no encontrado - requerido para generar nombre")
+            return None, None
+        parts = [dni]
+        metadata = {"dni": dni}
+        if verbose:
+            print(f"  🔢 DNI: {dni}")
+
+        if nombre:
+            # Máximo 4 palabras, sin caracteres no válidos
+            parts.append("_".join(nombre.split()[:4]).translate(self._FILENAME_STRIP))
+            metadata["nombre"] = nombre
             if verbose:
-                print("  [WARN] Empresa no encontrada")
-
-        # 4. TIPO DE EXAMEN
-        exam_type_value = None
-        if exam_type:
-            exam_type_value = exam_type
-        elif filename_data.get("exam_type"):
-            exam_type_value = filename_data["exam_type"]
-
-        if exam_type_value:
-            parts.append(exam_type_value)
-            metadata["tipo_examen"] = exam_type_value
+                print(f"  👤 Nombre: {nombre}")
+        elif verbose:
+            # Nombre es opcional pero recomendado
+            print("  [WARN] Nombre no encontrado")
+
+        if empresa:
+            parts.append("_".join(empresa.split()[:4]).translate(self._FILENAME_STRIP))
+            metadata["empresa"] = empresa
             if verbose:
-                print(f"  🏥 Tipo de examen: {exam_type_value}")
-        else:
-            # Tipo de examen es opcional
+                print(f"  🏢 Empresa: {empresa}")
+        elif verbose:
+            print("  [WARN] Empresa no encontrada")
+
+        if tipo_examen:
+            parts.append(tipo_examen)
+            metadata["tipo_examen"] = tipo_examen
             if verbose:
-                print("  [WARN] Tipo de examen no encontrado")
+                print(f"  🏥 Tipo de examen: {tipo_examen}")
+        elif verbose:
+            print("  [WARN] Tipo de examen no encontrado")
 
-        # 5. CMESPINAR (constante)
         parts.append("CMESPINAR")
         metadata["centro"] = "CMESPINAR"
         if verbose:
-            print(f"  🏥 Centro: CMESPINAR")
+            print("  🏥 Centro: CMESPINAR")
 
-        # 6. FECHA DE EVALUACION
-        if date:
-            try:
-                # Normaliza fecha: convierte 31.12.25 a 31-12-25, o 31/12/2025 a 31-12-2025
-                date_clean = re.sub(r"[^\d./-]", "", date)
-                # Si tiene formato DD.MM.YY, convierte a DD-MM-YY
-                if "." in date_clean:
-                    date_clean = date_clean.replace(".", "-")
-                else:
-                    date_clean = date_clean.replace("/", "-")
-                parts.append(date_clean)
-                metadata["fecha"] = date
-                if verbose:
-                    print(f"  📅 Fecha: {date}")
-            except Exception:
-                pass
-        elif filename_data.get("date"):
-            date_clean = filename_data["date"].replace(".", "-").replace("/", "-")
+        if fecha:
+            date, date_clean = fecha
             parts.append(date_clean)
-            metadata["fecha"] = filename_data["date"]
+            metadata["fecha"] = date
             if verbose:
-                print(f"  📅 Fecha (del nombre): {filename_data['date']}")
-
-        # Valida que al menos tengamos DNI y FECHA (mínimos requeridos)
-        if not parts or len(parts) < 2:
-            if verbose:
-                print("  [WARN] Información insuficiente para generar nombre")
-            return None, None
+                print(f"  📅 Fecha: {date}")
 
         # Une las partes y limpia caracteres no válidos
-        new_name = "_".join(parts)
-        new_name = re.sub(r'[<>:"/\\|?*]', "", new_name)
-        new_name = re.sub(r"\s+", "_", new_name)
-        new_name = re.sub(r"_+", "_", new_name)
-        new_name = new_name.strip("_")  # Elimina guiones al inicio/final
+        return self._finalize_filename("_".join(parts)) + ".pdf", metadata
 
-        return new_name + ".pdf", metadata
+
+# Per-process PDFProcessor for batch workers (built on first task)
+_WORKER_PROCESSOR = None
+
+
+def _worker_processor():
+    global _WORKER_PROCESSOR
+    if _WORKER_PROCESSOR is None:
+        _WORKER_PROCESSOR = PDFProcessor()
+    return _WORKER_PROCESSOR
+
+
+def _analyze_one(path, verbose, kwargs, processor=None):
+    """analyze_many task; module-level so ProcessPoolExecutor can pickle it."""
+    if processor is None:
+        processor = _worker_processor()
+    kwargs = dict(kwargs)
+    kwargs.setdefault("original_filename", os.path.basename(path))
+    return processor.analyze(path, verbose=verbose, **kwargs)
+
+
+def _timeout_worker(conn, task, args):
+    """Worker loop of _map_pdfs_timeout: run task for each path sent, until
+    the None sentinel (or a closed pipe)."""
+    while True:
+        try:
+            path = conn.recv()
+        except EOFError:
+            return
+        if path is None:
+            return
+        try:
+            conn.send((True, task(path, *args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+def _filename_parts_one(path, verbose, processor=None):
+    """generate_filenames_many task (see _analyze_one)."""
+    if processor is None:
+        processor = _worker_processor()
+    return processor.generate_filename_parts(
+        path, verbose=verbose, original_filename=os.path.basename(path)
+    )
@@ -59,6 +59,7 @@ a = Analysis(
         'pdf2image',
         'PIL',
         'webview',
+        'waitress',
     ] + openpyxl_hiddenimports + etxml_hiddenimports,
     hookspath=[],
     hooksconfig={},
@@ -6,10 +6,12 @@ Entry-point para ejecutar la app web local.
 """
 
 import os
+import socket
 import threading
+import time
 import webbrowser
 
-from app import app
+from app import app, start_server
 
 
 def _open_browser(port: int):
@@ -19,7 +21,28 @@ def _open_browser(port: int):
         pass
 
 
+def _open_browser_when_ready(port: int, timeout: float = 10.0):
+    """Abre el navegador en cuanto el servidor acepta conexiones.
+
+    Polls the port every 25 ms instead of a fixed delay, so a fast start isn't
+    kept waiting and a slow one (cold PyInstaller start) doesn't get an error
+    page. After *timeout* the browser is opened anyway.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                break
+        except OSError:
+            time.sleep(0.025)
+    _open_browser(port)
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5001"))
-    threading.Timer(1.0, _open_browser, args=(port,)).start()
-    app.run(debug=False, host="127.0.0.1", port=port)
+    threading.Thread(target=_open_browser_when_ready, args=(port,), daemon=True).start()
+    if os.environ.get("FLASK_DEV") == "1":
+        # Debugger sin recargador (the reloader would open a second browser)
+        app.run(debug=True, host="127.0.0.1", port=port, use_reloader=False)
+    else:
+        start_server(port)
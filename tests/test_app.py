@@ -0,0 +1,150 @@
+"""
+pytest tests for the Flask app (upload, download, session storage).
+
+Run with:
+    pytest tests/test_app.py -v
+"""
+
+import gc
+import io
+import os
+import zipfile
+
+import pytest
+
+import app as webapp
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+class TestPrivateDir:
+    def test_creates_private_dir(self, tmp_path):
+        path = tmp_path / "uploads"
+        assert webapp._private_dir(path)
+        assert os.stat(path).st_mode & 0o777 == 0o700
+
+    def test_rejects_shared_dir_and_symlink(self, tmp_path):
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        os.chmod(shared, 0o777)
+        assert not webapp._private_dir(shared)
+        link = tmp_path / "link"
+        private = tmp_path / "private"
+        private.mkdir(mode=0o700)
+        link.symlink_to(private)
+        assert not webapp._private_dir(link)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(webapp, "_desktop_licensed", True)
+    monkeypatch.setattr(webapp, "_UPLOAD_ROOT", tmp_path)
+    return webapp.app.test_client()
+
+
+def _session_with_pdfs(root, *payloads):
+    session = root / "s1"
+    session.mkdir()
+    for i, payload in enumerate(payloads):
+        (session / f"{i}.pdf").write_bytes(payload)
+    return "s1"
+
+
+class TestDownloadZip:
+    def _download(self, client, files):
+        resp = client.post(
+            "/api/download-zip", json={"session_id": "s1", "files": files}
+        )
+        body = resp.get_data()
+        assert resp.status_code == 200
+        assert resp.content_length == len(body)
+        return zipfile.ZipFile(io.BytesIO(body))
+
+    def test_valid_archive_with_utf8_names(self, client, tmp_path):
+        _session_with_pdfs(tmp_path, b"%PDF-1 uno", b"%PDF-1 dos" * 1000)
+        zf = self._download(
+            client,
+            [
+                {"index": 0, "filename": "PEÑA MUÑOZ.pdf"},
+                {"index": 1, "filename": "plain.pdf"},
+            ],
+        )
+        assert zf.testzip() is None
+        infos = zf.infolist()
+        assert [i.filename for i in infos] == ["PEÑA MUÑOZ.pdf", "plain.pdf"]
+        assert infos[0].flag_bits & 0x800
+        assert not infos[1].flag_bits & 0x808  # ASCII name, no data descriptor
+        assert zf.read("plain.pdf") == b"%PDF-1 dos" * 1000
+
+    def test_file_replaced_after_request_start(self, client, tmp_path, monkeypatch):
+        _session_with_pdfs(tmp_path, b"%PDF-1 original")
+        original = webapp._zip_central_directory
+
+        def replace_then_build(infos, start):
+            # Between the CRC pass and the body, as the reaper/TTL sweep would
+            (tmp_path / "s1" / "0.pdf").unlink()
+            return original(infos, start)
+
+        monkeypatch.setattr(webapp, "_zip_central_directory", replace_then_build)
+        zf = self._download(client, [{"index": 0, "filename": "a.pdf"}])
+        assert zf.read("a.pdf") == b"%PDF-1 original"
+
+    def test_zip64_fallback(self, client, tmp_path, monkeypatch):
+        _session_with_pdfs(tmp_path, b"%PDF-1 x" * 100, b"%PDF-1 y" * 100)
+        monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 500)
+        zf = self._download(
+            client,
+            [{"index": 0, "filename": "a.pdf"}, {"index": 1, "filename": "b.pdf"}],
+        )
+        assert zf.testzip() is None
+        assert zf.read("b.pdf") == b"%PDF-1 y" * 100
+
+
+def _open_fds():
+    # The test client spools big request bodies to a TemporaryFile of its own
+    # and leaves it to the garbage collector
+    gc.collect()
+    return len(os.listdir("/proc/self/fd"))
+
+
+class TestUpload:
+    @pytest.fixture(params=["o_tmpfile", "named_part"])
+    def upload_client(self, request, client, tmp_path, monkeypatch):
+        monkeypatch.setattr(webapp, "UPLOAD_DIR", tmp_path)
+        if request.param == "named_part":
+            monkeypatch.setattr(webapp, "_O_TMPFILE", 0)
+        elif not webapp._O_TMPFILE:
+            pytest.skip("O_TMPFILE not available")
+        return client
+
+    def _upload(self, client, name, payload):
+        resp = client.post(
+            "/api/upload",
+            data={"files": (io.BytesIO(payload), name), "session_id": "s1"},
+            content_type="multipart/form-data",
+        )
+        assert resp.status_code == 200
+        return resp.get_json()["results"][0]
+
+    def _leftovers(self, root):
+        return [p.name for p in root.rglob("*.part")] + [
+            p.name for p in root.iterdir() if p.is_file()
+        ]
+
+    @pytest.mark.parametrize("size", [10 * 1024, 600 * 1024])  # in memory, spooled
+    def test_pdf_part_is_stored(self, upload_client, tmp_path, size):
+        payload = b"%PDF-1.4\n" + os.urandom(size)
+        fds = _open_fds() if os.path.isdir("/proc/self/fd") else None
+        self._upload(upload_client, "a.pdf", payload)
+        assert (tmp_path / "s1" / "0.pdf").read_bytes() == payload
+        assert self._leftovers(tmp_path) == []
+        if fds is not None:
+            assert _open_fds() == fds
+
+    def test_non_pdf_part_is_rejected(self, upload_client, tmp_path):
+        fds = _open_fds() if os.path.isdir("/proc/self/fd") else None
+        result = self._upload(upload_client, "notes.txt", os.urandom(600 * 1024))
+        assert not result["success"]
+        assert not (tmp_path / "s1" / "0.pdf").exists()
+        assert self._leftovers(tmp_path) == []
+        if fds is not None:
+            assert _open_fds() == fds
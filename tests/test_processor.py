@@ -6,10 +6,14 @@ Run with:
 """
 
 import json
+import os
+import time
+import types
 import pytest
 from pathlib import Path
 
-from pdf_processor import PDFProcessor
+import pdf_processor
+from pdf_processor import PDFProcessor, _LRUCache
 
 # Known sample files (from project memory)
 HUDBAY_PDF = Path(r"/Users/aldair/Proyectos Software/PDF SETTER FILES/SKM_368e26013117570.pdf")
@@ -27,6 +31,15 @@ def _skip_if_missing(path: Path):
         pytest.skip(f"Sample PDF not found: {path}")
 
 
+def _misbehaving_task(path):
+    """_map_pdfs task (module level, so worker processes can import it)."""
+    if path == "hang":
+        time.sleep(60)
+    if path == "crash":
+        os._exit(1)  # like a segfaulting parser
+    return path.upper()
+
+
 # ------------------------------------------------------------------ #
 # Unit tests — pure logic, no file I/O                               #
 # ------------------------------------------------------------------ #
@@ -87,6 +100,16 @@ class TestExtractDateCandidates:
         result = processor.extract_date_candidates(text)
         assert "01-06-25" in result
 
+    def test_iso_date_not_split(self):
+        result = processor.extract_date_candidates("Emitido 2024-01-15")
+        assert result == ["2024-01-15"]
+
+    def test_uppercase_month_name_date(self):
+        assert processor.extract_dates("Lima, 31 DE ENERO DE 2024") == (
+            "31 DE ENERO DE 2024"
+        )
+        assert processor.extract_dates("31 De Enero De 2024") == "31 De Enero De 2024"
+
 
 class TestExtractExamTypeCandidates:
     def test_labeled(self):
@@ -149,6 +172,24 @@ class TestDetectFormat:
         assert processor.detect_format("scan_001.pdf") is None
 
 
+class TestExtractFromFilename:
+    def test_hudbay_filename(self):
+        parts = processor.extract_from_filename("15.03.26 EMOA 76248882 HUAMAN POCCO-G4S.pdf")
+        assert parts["date"] == "15.03.26"
+        assert parts["exam_type"] == "PERIODICO"
+        assert parts["dni"] == "76248882"
+
+    def test_generic_filename_abbreviation(self):
+        parts = processor.extract_from_filename("scan 76248882 emor.pdf")
+        assert parts["dni"] == "76248882"
+        assert parts["exam_type"] == "POSTOCUPACIONAL"
+
+    def test_cached_result_not_shared(self):
+        name = "scan 76248882 emor.pdf"
+        processor.extract_from_filename(name)["dni"] = "00000000"
+        assert processor.extract_from_filename(name)["dni"] == "76248882"
+
+
 class TestDetectFormatFromContent:
     def test_detects_hudbay_keyword(self):
         assert processor.detect_format_from_content("HUDBAY MINERALS") == "hudbay"
@@ -160,6 +201,174 @@ class TestDetectFormatFromContent:
         assert processor.detect_format_from_content("texto generico") is None
 
 
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = _LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "a" is now most recent
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+
+class TestIsBlankPage:
+    def test_blank_and_inked_pages(self):
+        Image = pytest.importorskip("PIL.Image")
+        page = Image.new("L", (600, 800), 255)
+        assert processor._is_blank_page(page)
+        page.paste(0, (50, 50, 250, 80))  # a line of "text"
+        assert not processor._is_blank_page(page)
+
+    def test_faint_text_is_not_blank(self):
+        Image = pytest.importorskip("PIL.Image")
+        page = Image.new("L", (600, 800), 255)
+        page.paste(150, (50, 50, 250, 80))  # gray print, no pixel below 128
+        assert not processor._is_blank_page(page)
+        scan = Image.new("L", (600, 800), 225)  # grayish paper, light noise
+        scan.paste(240, (0, 0, 600, 400))
+        assert processor._is_blank_page(scan)
+
+
+class TestTesserocrPool:
+    def _fake_tesserocr(self, monkeypatch, engine):
+        inits = []
+
+        def api(**kwargs):
+            inits.append(kwargs["lang"])
+            return engine()
+
+        fake = types.SimpleNamespace(
+            PyTessBaseAPI=api, PSM=types.SimpleNamespace(SINGLE_BLOCK=6)
+        )
+        monkeypatch.setattr(pdf_processor, "tesserocr", fake)
+        monkeypatch.setattr(pdf_processor, "_TESS_APIS", {})
+        monkeypatch.setattr(pdf_processor, "_TESS_INIT_FAILED", set())
+        return inits
+
+    def test_failed_init_is_not_retried(self, monkeypatch):
+        def engine():
+            raise RuntimeError("Failed to init API")
+
+        inits = self._fake_tesserocr(monkeypatch, engine)
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                pdf_processor._tesserocr_text(None, "spa+eng")
+        assert inits == ["spa+eng"]
+
+    def test_close_ends_idle_engines(self, monkeypatch):
+        ended = []
+
+        class Engine:
+            def SetImage(self, image):
+                pass
+
+            def GetUTF8Text(self):
+                return "texto"
+
+            def End(self):
+                ended.append(self)
+
+        inits = self._fake_tesserocr(monkeypatch, Engine)
+        assert pdf_processor._tesserocr_text(None, "eng") == "texto"
+        assert pdf_processor._tesserocr_text(None, "eng") == "texto"
+        assert inits == ["eng"]  # engine reused
+        PDFProcessor().close()
+        assert len(ended) == 1
+        assert pdf_processor._TESS_APIS == {}
+
+
+class TestOcrPageWindow:
+    """Scanned PDFs: which pages the OCR fallback reads (no digital text)."""
+
+    def _scan(self, tmp_path, monkeypatch, page_texts):
+        fitz = pytest.importorskip("fitz")
+        doc = fitz.open()
+        for _ in page_texts:
+            doc.new_page()
+        pdf = tmp_path / "scan.pdf"
+        doc.save(str(pdf))
+        doc.close()
+        proc = PDFProcessor()
+        rendered = []
+
+        def render(path, first, last, **kwargs):
+            pages = list(range(first, min(last, len(page_texts)) + 1))
+            rendered.extend(pages)
+            return pages
+
+        monkeypatch.setattr(proc, "_can_ocr", lambda: True)
+        monkeypatch.setattr(proc, "_render_pages", render)
+        monkeypatch.setattr(
+            proc, "_ocr_images", lambda pages: [page_texts[n - 1] for n in pages]
+        )
+        text = proc._extract_text_uncached(str(pdf), True, False, None)
+        return text, rendered
+
+    def test_standard_layout_reads_page_two(self, tmp_path, monkeypatch):
+        text, rendered = self._scan(
+            tmp_path,
+            monkeypatch,
+            ["FACTURA N 12345678 FECHA 01/02/2026", "APELLIDOS: PEREZ GARCIA"],
+        )
+        assert rendered == [1, 2]
+        assert "PEREZ GARCIA" in text
+
+    def test_hudbay_stops_after_page_one(self, tmp_path, monkeypatch):
+        text, rendered = self._scan(
+            tmp_path,
+            monkeypatch,
+            ["HUDBAY FOR-SSO-293 DNI: 12345678 01/02/2026", "ANEXO"],
+        )
+        assert rendered == [1]
+        assert "ANEXO" not in text
+
+
+class TestGenerateFilenamesManyCache:
+    def test_second_run_reuses_cached_names(self, tmp_path, monkeypatch):
+        fitz = pytest.importorskip("fitz")
+        doc = fitz.open()
+        doc.new_page().insert_text((40, 72), "DNI: 12345678 PEREZ GARCIA JUAN")
+        pdf = tmp_path / "a.pdf"
+        doc.save(str(pdf))
+        doc.close()
+        cache = tmp_path / "names.json"
+        proc = PDFProcessor()
+        first = proc.generate_filenames_many([str(pdf)], workers=1, cache_file=cache)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("cached PDF analyzed again")
+
+        monkeypatch.setattr(proc, "generate_filename_parts", fail)
+        second = proc.generate_filenames_many([str(pdf)], workers=1, cache_file=cache)
+        assert second == first
+        assert json.loads(cache.read_text())
+
+
+class TestMapPdfsTimeout:
+    def _run(self, paths):
+        return PDFProcessor()._map_pdfs(
+            _misbehaving_task,
+            paths,
+            2,
+            timeout=1.0,
+            on_timeout="timeout",
+            on_crash="crashed",
+        )
+
+    def test_hanging_pdf_times_out(self):
+        start = time.monotonic()
+        result = self._run(["a", "hang", "b", "c"])
+        assert result == {"a": "A", "hang": "timeout", "b": "B", "c": "C"}
+        assert time.monotonic() - start < 10
+
+    def test_crashing_pdf_does_not_end_batch(self):
+        result = self._run(["a", "crash", "b", "c"])
+        assert result == {"a": "A", "crash": "crashed", "b": "B", "c": "C"}
+
+
 # ------------------------------------------------------------------ #
 # Integration tests — require sample PDF files                       #
 # ------------------------------------------------------------------ #
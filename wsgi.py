@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Entry-point WSGI para despliegues en servidor (VPS / PaaS).
+
+    gunicorn -w 1 --threads 8 --preload wsgi:app
+
+Las sesiones de Excel viven en memoria del proceso, así que usa un solo worker
+y escala con threads: las páginas se renderizan en proceso con PyMuPDF y el OCR
+corre en tesserocr (libera el GIL) o, si no está instalado, en subprocesos de
+tesseract.
+
+Con --preload la app se importa en el master y el worker se crea con fork: los
+threads de fondo (limpieza por TTL, borrado de descargas) no sobreviven al
+fork, así que cada worker los arranca en su primer request
+(app._ensure_background_threads).
+"""
+
+from app import app  # noqa: F401